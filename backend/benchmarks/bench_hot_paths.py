@@ -0,0 +1,284 @@
+"""Offline performance baseline for the scoring and API hot paths.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_hot_paths --output bench.json
+    python -m benchmarks.bench_hot_paths --baseline bench.json --threshold 0.2
+
+Results are written as JSON. With --baseline, the run exits non-zero when any
+metric is worse than the baseline by more than the threshold (a fraction, so
+0.2 means 20%).
+
+The API section imports main, which needs the data and analysis services and
+settings module (services.data_service, services.analysis_service,
+utils.config). Where those are not installed it is skipped with a message;
+pass --skip-api to leave it out explicitly.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import sklearn
+from fastapi.encoders import jsonable_encoder
+
+from models.data_models import CriteriaWeights, SiteData, SuitabilityAnalysis, SuitabilityResponse
+from models.suitability_model import HydrogenSuitabilityModel
+from services.serialization import dump_models, parse_fields
+from benchmarks.bench_site_store import synthetic_sites
+
+BATCH_SIZES = [10, 1_000, 100_000]
+
+def _timings(fn: Callable, repeats: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def _latency(samples: List[float]) -> Dict[str, Any]:
+    """Median latency in ms, with p95 kept for reference"""
+    ordered = sorted(samples)
+    return {
+        "value": statistics.median(ordered) * 1000,
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+        "unit": "ms",
+        "higher_is_better": False
+    }
+
+def _throughput(samples: List[float], items: int) -> Dict[str, Any]:
+    return {"value": items / statistics.median(samples), "unit": "sites/s", "higher_is_better": True}
+
+def bench_predict(model_path: str, repeats: int, batch_sizes: List[int]) -> Dict[str, Dict[str, Any]]:
+    """Single-site latency and batch throughput for both scoring engines"""
+    results = {}
+    weights = CriteriaWeights()
+    sites = synthetic_sites(max(batch_sizes))
+    
+    for engine, compiled in (("sklearn", False), ("compiled", True)):
+        model = HydrogenSuitabilityModel(model_path=model_path, use_compiled_engine=compiled)
+        model.load_model(train_if_missing=False)
+        
+        samples = _timings(lambda: model.predict_suitability(sites[0], weights), repeats * 20)
+        results[f"predict_single_{engine}"] = _latency(samples)
+        
+        for size in batch_sizes:
+            batch = sites[:size]
+            samples = _timings(lambda: model.predict_suitability_batch(batch, weights), repeats)
+            results[f"predict_batch_{size}_{engine}"] = _throughput(samples, size)
+    return results
+
+def bench_load_model(model_path: str, repeats: int) -> Dict[str, Dict[str, Any]]:
+    """Artifact load time in a fresh interpreter (cold) and when re-loaded in-process (warm)"""
+    script = (
+        "import time; start = time.perf_counter()\n"
+        "from models.suitability_model import HydrogenSuitabilityModel\n"
+        f"model = HydrogenSuitabilityModel(model_path={model_path!r})\n"
+        "assert model.load_model(train_if_missing=False)\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    cold = [
+        float(subprocess.run(
+            [sys.executable, "-c", script], cwd=backend_dir, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1])
+        for _ in range(repeats)
+    ]
+    
+    model = HydrogenSuitabilityModel(model_path=model_path)
+    warm = _timings(lambda: model.load_model(train_if_missing=False), repeats)
+    return {"load_model_cold": _latency(cold), "load_model_warm": _latency(warm)}
+
+def _sample_response(i: int) -> SuitabilityResponse:
+    return SuitabilityResponse(
+        site_id=f"site-{i}",
+        site_name=f"Site {i}",
+        suitability_score=82.5,
+        analysis=SuitabilityAnalysis(
+            overall_score=82.5,
+            category="Excellent",
+            solar_score=88.0,
+            wind_score=64.0,
+            water_score=52.0,
+            proximity_score=71.0,
+            infrastructure_score=60.0,
+            strengths=["Excellent solar resource", "Good grid connectivity"],
+            weaknesses=["Limited water availability"],
+            recommendations=["Consider desalination or water recycling"],
+            risk_level="Low",
+            risk_factors=["Water scarcity"],
+            investment_priority="High",
+            payback_period="6-8 years"
+        ),
+        timestamp=datetime.now().isoformat()
+    )
+
+def bench_serialization(repeats: int) -> Dict[str, Dict[str, Any]]:
+    """SuitabilityResponse encoding via FastAPI's default path and Pydantic's JSON serializer"""
+    single = _sample_response(0)
+    batch = [_sample_response(i) for i in range(1000)]
+    score_only = parse_fields(SuitabilityResponse, "score")
+    return {
+        "serialize_response_fastapi": _latency(_timings(lambda: json.dumps(jsonable_encoder(single)), repeats * 20)),
+        "serialize_response_pydantic": _latency(_timings(single.model_dump_json, repeats * 20)),
+        "serialize_batch_1000_fastapi": _latency(_timings(lambda: json.dumps(jsonable_encoder(batch)), repeats)),
+        "serialize_batch_1000_pydantic": _latency(_timings(lambda: dump_models(SuitabilityResponse, batch), repeats)),
+        "serialize_batch_1000_score_only": _latency(_timings(
+            lambda: dump_models(SuitabilityResponse, batch, score_only), repeats
+        )),
+    }
+
+class SyntheticDataService:
+    """In-memory replacement for the data service so API calls run offline"""
+    
+    def __init__(self, sites: List[SiteData]):
+        self.sites = {site.id: site for site in sites}
+    
+    async def initialize(self):
+        pass
+    
+    async def get_all_sites(self) -> List[SiteData]:
+        return list(self.sites.values())
+    
+    async def get_site_by_id(self, site_id: str) -> Optional[SiteData]:
+        return self.sites.get(site_id)
+    
+    async def get_enhanced_site_data(self, site_id: str) -> Optional[SiteData]:
+        return self.sites.get(site_id)
+
+def bench_api(repeats: int, n_sites: int) -> Dict[str, Dict[str, Any]]:
+    """End-to-end request latency through the FastAPI test client"""
+    from fastapi.testclient import TestClient
+    try:
+        import main
+    except ImportError as e:
+        print(f"Skipping API benchmarks: cannot import main ({e})", file=sys.stderr)
+        return {}
+    
+    sites = synthetic_sites(n_sites)
+    main.data_service = main.site_loader.data_service = SyntheticDataService(sites)
+    weights = CriteriaWeights().model_dump()
+    calls = iter(range(10 ** 9))
+    
+    def analyze():
+        # Rotate through sites so the score cache does not turn this into a cache benchmark
+        site = sites[next(calls) % len(sites)]
+        response = client.post("/api/suitability/analyze", json={
+            "site_id": site.id, "site_name": site.name, "criteria_weights": weights
+        })
+        response.raise_for_status()
+    
+    batch_body = {
+        "sites": [{"site_id": site.id, "site_name": site.name, "criteria_weights": weights} for site in sites[:100]],
+        "criteria_weights": weights
+    }
+    
+    def call(method: str, url: str, **kwargs):
+        def run():
+            client.request(method, url, **kwargs).raise_for_status()
+        return run
+    
+    with TestClient(main.app) as client:
+        results = {
+            "api_analyze": _latency(_timings(analyze, repeats * 10)),
+            "api_batch_100": _latency(_timings(call("POST", "/api/suitability/batch", json=batch_body), repeats)),
+            "api_rank_top_100": _latency(_timings(
+                call("POST", "/api/suitability/rank", json={"criteria_weights": weights, "k": 100}), repeats * 10
+            )),
+            "api_site_by_id": _latency(_timings(call("GET", f"/api/sites/{sites[0].id}"), repeats * 10)),
+        }
+    return results
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            threshold: float) -> List[str]:
+    """Metrics that moved in the wrong direction by more than threshold"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        change = (current["value"] - previous["value"]) / previous["value"]
+        if current["higher_is_better"]:
+            change = -change
+        if change > threshold:
+            regressions.append(
+                f"{name}: {previous['value']:.4g} -> {current['value']:.4g} {current['unit']} ({change:+.0%} worse)"
+            )
+    return regressions
+
+def run(args) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="h2-bench-")
+    model_path = os.path.join(workdir, "models", "hydrogen_suitability_model.pkl")
+    os.makedirs(os.path.dirname(model_path))
+    # Train once up front; every benchmark below loads this artifact
+    HydrogenSuitabilityModel(model_path=model_path).load_model()
+    
+    batch_sizes = [size for size in BATCH_SIZES if size <= args.max_batch]
+    results = {}
+    results.update(bench_predict(model_path, args.repeats, batch_sizes))
+    results.update(bench_load_model(model_path, args.repeats))
+    results.update(bench_serialization(args.repeats))
+    if not args.skip_api:
+        # main resolves its model artifact and job directories relative to the working directory
+        os.chdir(workdir)
+        results.update(bench_api(args.repeats, args.api_sites))
+    
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "scikit_learn": sklearn.__version__,
+            "cpu_count": os.cpu_count(),
+            "repeats": args.repeats
+        },
+        "results": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scoring and API hot paths")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-batch", type=int, default=max(BATCH_SIZES), help="Largest batch size to run")
+    parser.add_argument("--api-sites", type=int, default=1000, help="Synthetic sites served to the API benchmarks")
+    parser.add_argument("--skip-api", action="store_true", help="Skip the end-to-end FastAPI benchmarks")
+    parser.add_argument("--output", help="Write results JSON to this path")
+    parser.add_argument("--baseline", help="Results JSON from a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown as a fraction of the baseline")
+    args = parser.parse_args()
+    # The API benchmarks change directory, so pin user-supplied paths first
+    args.output = os.path.abspath(args.output) if args.output else None
+    args.baseline = os.path.abspath(args.baseline) if args.baseline else None
+    
+    report = run(args)
+    for name, result in report["results"].items():
+        print(f"{name:36s} {result['value']:14.4f} {result['unit']}")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(report["results"], baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
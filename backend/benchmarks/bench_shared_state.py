@@ -0,0 +1,96 @@
+"""Compare worker startup time and memory when every worker loads its own sites versus attaching shared state.
+
+Run from the backend directory (Linux only; memory is read from /proc/self/smaps_rollup):
+
+    python -m benchmarks.bench_shared_state --sites 200000 --workers 1 4 8
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+from models.data_models import CriteriaWeights
+from models.suitability_model import HydrogenSuitabilityModel
+from services.shared_state import SharedState
+from services.site_scores import SiteScoreTable
+from benchmarks.bench_site_store import synthetic_sites
+
+def _memory() -> Dict[str, int]:
+    """Proportional (Pss) and private (Uss) set size of this process in bytes"""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {"pss": fields["Pss"], "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+def _worker(mode: str, n_sites: int, model_path: str, shared_dir: str, barrier, results):
+    baseline = _memory()
+    start = time.perf_counter()
+    model = HydrogenSuitabilityModel(model_path=model_path)
+    table = SiteScoreTable(model)
+    if mode == "shared":
+        SharedState(shared_dir, table).refresh()
+    else:
+        model.load_model(train_if_missing=False, mmap_mode="r")
+        table.load(synthetic_sites(n_sites))
+    startup_s = time.perf_counter() - start
+    # Touch every array a request would, so both modes have their working set resident
+    table.score_all(CriteriaWeights())
+    table.store.records(range(0, len(table), max(1, len(table) // 1000)))
+    
+    # Measure while all workers are alive, so shared pages are split between them
+    barrier.wait()
+    memory = _memory()
+    results.put({
+        "startup_s": startup_s,
+        "pss": memory["pss"] - baseline["pss"],
+        "uss": memory["uss"] - baseline["uss"]
+    })
+    barrier.wait()
+
+def run_workers(mode: str, n_workers: int, n_sites: int, model_path: str, shared_dir: str) -> List[Dict[str, float]]:
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(n_workers), context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(mode, n_sites, model_path, shared_dir, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for process in processes:
+        process.start()
+    measurements = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return measurements
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared, memory-mapped worker state")
+    parser.add_argument("--sites", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "model.pkl")
+        model = HydrogenSuitabilityModel(model_path=model_path)
+        model.load_model(train_if_missing=True)
+        table = SiteScoreTable(model)
+        table.load(synthetic_sites(args.sites))
+        shared_dir = os.path.join(tmp, "shared")
+        SharedState(shared_dir, table).publish()
+        del table
+        
+        print(f"sites: {args.sites}")
+        print(f"{'mode':>8} {'workers':>8} {'startup s':>10} {'total PSS MB':>13} {'private MB/worker':>18}")
+        for n_workers in args.workers:
+            for mode in ("local", "shared"):
+                measurements = run_workers(mode, n_workers, args.sites, model_path, shared_dir)
+                startup = max(m["startup_s"] for m in measurements)
+                total_pss = sum(m["pss"] for m in measurements) / 2 ** 20
+                private = sum(m["uss"] for m in measurements) / n_workers / 2 ** 20
+                print(f"{mode:>8} {n_workers:>8} {startup:>10.2f} {total_pss:>13.1f} {private:>18.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Compare memory and scoring throughput of Pydantic SiteData lists and the columnar SiteStore.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_site_store --sites 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from typing import List
+
+import numpy as np
+
+from models.data_models import SiteData, CriteriaWeights, LandType, PolicyZone, InfrastructureType
+from models.suitability_model import HydrogenSuitabilityModel
+from services.site_scores import SiteScoreTable
+from services.site_store import SiteStore
+
+def synthetic_sites(n: int, seed: int = 42) -> List[SiteData]:
+    """Sites with feature distributions in the style of _prepare_training_data"""
+    rng = np.random.default_rng(seed)
+    land_types, zones, infra = list(LandType), list(PolicyZone), list(InfrastructureType)
+    states = ['Rajasthan', 'Gujarat', 'Tamil Nadu', 'Karnataka', 'Maharashtra', 'Ladakh']
+    return [
+        SiteData(
+            id=f"site-{i}",
+            name=f"Site {i}",
+            coordinates=[float(rng.uniform(8, 36)), float(rng.uniform(68, 97))],
+            state=states[i % len(states)],
+            district=f"District {i % 50}",
+            solar_index=float(np.clip(rng.normal(78, 15), 0, 100)),
+            wind_index=float(np.clip(rng.normal(63, 20), 0, 100)),
+            water_index=float(np.clip(rng.normal(50, 25), 0, 100)),
+            industry_proximity=float(rng.exponential(50)),
+            grid_proximity=float(rng.exponential(30)),
+            water_source_distance=float(rng.exponential(20)),
+            land_availability=float(rng.uniform(1, 10)),
+            elevation=float(rng.uniform(0, 5)),
+            land_type=land_types[i % len(land_types)],
+            policy_zone=zones[i % len(zones)],
+            existing_infrastructure=[infra[i % len(infra)], infra[(i + 3) % len(infra)]],
+            policy_incentives=["State solar policy"],
+            estimated_roi="12-15%",
+            project_timeline="3-4 years"
+        )
+        for i in range(n)
+    ]
+
+def _measure(fn):
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+def run(n_sites: int, repeats: int):
+    model = HydrogenSuitabilityModel(model_path="models/hydrogen_suitability_model.pkl")
+    model.load_model()
+    weights = CriteriaWeights()
+    
+    sites, list_bytes = _measure(lambda: synthetic_sites(n_sites))
+    store, store_bytes = _measure(lambda: _build_store(sites))
+    
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict_suitability_batch(sites, weights)
+    list_s = (time.perf_counter() - start) / repeats
+    
+    start = time.perf_counter()
+    for _ in range(repeats):
+        features = store.features
+        model.combine_scores(model.component_scores(features), model.predict_base_scores(features), weights)
+    store_s = (time.perf_counter() - start) / repeats
+    
+    table = SiteScoreTable(model)
+    table.load(sites)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        table.score_all(weights)
+    reweight_s = (time.perf_counter() - start) / repeats
+    
+    print(f"sites: {n_sites}")
+    print(f"memory/site   List[SiteData]: {list_bytes / n_sites:8.0f} B   SiteStore: {store_bytes / n_sites:8.0f} B")
+    print(f"full scoring  List[SiteData]: {n_sites / list_s:10.0f} sites/s   SiteStore: {n_sites / store_s:10.0f} sites/s")
+    print(f"re-weighting  precomputed base scores: {n_sites / reweight_s:10.0f} sites/s")
+
+def _build_store(sites: List[SiteData]) -> SiteStore:
+    store = SiteStore()
+    store.upsert_sites(sites)
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the columnar site store")
+    parser.add_argument("--sites", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sites, args.repeats)
+
+if __name__ == "__main__":
+    main()
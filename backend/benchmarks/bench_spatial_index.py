@@ -0,0 +1,80 @@
+"""Benchmark GeoGridIndex queries against brute-force scans.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_spatial_index --sizes 1000 100000 1000000
+"""
+import argparse
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from services.spatial_index import GeoGridIndex, haversine_km
+
+# Rough bounding box of India
+LAT_RANGE = (8.0, 37.0)
+LON_RANGE = (68.0, 97.0)
+
+def _time_per_query(fn: Callable[[int], None], n_queries: int) -> float:
+    start = time.perf_counter()
+    for i in range(n_queries):
+        fn(i)
+    return (time.perf_counter() - start) / n_queries
+
+def run(sizes: List[int], n_queries: int, radius_km: float, k: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    print(f"{'points':>10} {'build_s':>9} {'query':>8} {'index_ms':>10} {'brute_ms':>10} {'speedup':>8}")
+    
+    for n in sizes:
+        lats = rng.uniform(*LAT_RANGE, n)
+        lons = rng.uniform(*LON_RANGE, n)
+        query_lats = rng.uniform(*LAT_RANGE, n_queries)
+        query_lons = rng.uniform(*LON_RANGE, n_queries)
+        
+        index = GeoGridIndex()
+        start = time.perf_counter()
+        index.build(np.column_stack([lats, lons]))
+        build_s = time.perf_counter() - start
+        
+        def brute_radius(i):
+            d = haversine_km(query_lats[i], query_lons[i], lats, lons)
+            return np.flatnonzero(d <= radius_km)
+        
+        def brute_nearest(i):
+            d = haversine_km(query_lats[i], query_lons[i], lats, lons)
+            return np.argpartition(d, min(k, n) - 1)[:k]
+        
+        def brute_bbox(i):
+            return np.flatnonzero(
+                (lats >= query_lats[i]) & (lats <= query_lats[i] + 1) &
+                (lons >= query_lons[i]) & (lons <= query_lons[i] + 1)
+            )
+        
+        # Results must match brute force before timings mean anything
+        for i in range(min(n_queries, 10)):
+            assert set(index.radius(query_lats[i], query_lons[i], radius_km)[0]) == set(brute_radius(i))
+            assert set(index.nearest(query_lats[i], query_lons[i], k)[0]) == set(brute_nearest(i))
+            assert set(index.bbox(query_lats[i], query_lons[i], query_lats[i] + 1, query_lons[i] + 1)) == set(brute_bbox(i))
+        
+        cases = [
+            ("radius", lambda i: index.radius(query_lats[i], query_lons[i], radius_km), brute_radius),
+            ("nearest", lambda i: index.nearest(query_lats[i], query_lons[i], k), brute_nearest),
+            ("bbox", lambda i: index.bbox(query_lats[i], query_lons[i], query_lats[i] + 1, query_lons[i] + 1), brute_bbox),
+        ]
+        for name, indexed, brute in cases:
+            index_s = _time_per_query(indexed, n_queries)
+            brute_s = _time_per_query(brute, n_queries)
+            print(f"{n:>10} {build_s:>9.3f} {name:>8} {index_s * 1e3:>10.3f} {brute_s * 1e3:>10.3f} {brute_s / index_s:>7.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the spatial index against brute force")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--radius-km", type=float, default=50.0)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    run(args.sizes, args.queries, args.radius_km, args.k)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Check the incremental site statistics against full recomputation and time both.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_statistics --sites 100000 --updates 200
+
+Exits non-zero if the running aggregates drift from a full recomputation.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from models.suitability_model import HydrogenSuitabilityModel
+from services.site_scores import SiteScoreTable
+from services.site_statistics import SiteStatistics
+from benchmarks.bench_site_store import synthetic_sites
+
+STATES = ['Rajasthan', 'Gujarat', 'Tamil Nadu', 'Karnataka', 'Maharashtra', 'Ladakh', 'Odisha']
+
+def run(n_sites: int, n_updates: int, batch_size: int) -> bool:
+    model = HydrogenSuitabilityModel(model_path="models/hydrogen_suitability_model.pkl")
+    model.load_model()
+    rng = np.random.default_rng(7)
+    
+    # Half the sites carry a stored score, the rest are counted at their model score
+    sites = [
+        site.model_copy(update={'suitability_score': float(rng.uniform(0, 100))}) if i % 2 else site
+        for i, site in enumerate(synthetic_sites(n_sites))
+    ]
+    table = SiteScoreTable(model)
+    statistics = SiteStatistics(table)
+    table.load(sites)
+    
+    ok = not statistics.check_consistency()
+    start = time.perf_counter()
+    for update in range(n_updates):
+        # Mix of changed sites (new state, score or features) and brand-new ones
+        changed = [
+            sites[i].model_copy(update={
+                'state': STATES[int(rng.integers(len(STATES)))],
+                'suitability_score': None if rng.random() < 0.3 else float(rng.uniform(0, 100)),
+                'solar_index': float(rng.uniform(0, 100))
+            })
+            for i in rng.integers(len(sites), size=batch_size)
+        ]
+        added = [site.model_copy(update={'id': f"new-{update}-{site.id}"}) for site in sites[:2]]
+        table.upsert_sites(changed + added)
+    update_s = (time.perf_counter() - start) / n_updates
+    
+    mismatches = statistics.check_consistency()
+    ok = ok and not mismatches
+    
+    start = time.perf_counter()
+    for _ in range(1000):
+        statistics.statistics()
+    cached_s = (time.perf_counter() - start) / 1000
+    
+    start = time.perf_counter()
+    statistics.recompute()
+    full_s = time.perf_counter() - start
+    
+    print(f"sites: {len(table)}")
+    print(f"incremental update ({batch_size + 2} sites): {update_s * 1000:8.3f} ms")
+    print(f"statistics() read:                {cached_s * 1e6:8.1f} us")
+    print(f"full recomputation:               {full_s * 1000:8.3f} ms")
+    print("consistent with full recomputation" if ok else f"DRIFT: {mismatches[:10]}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental site statistics")
+    parser.add_argument("--sites", type=int, default=100_000)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+    if not run(args.sites, args.updates, args.batch_size):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,66 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import numpy as np
 import uvicorn
+import asyncio
 import logging
+import os
+import json
+import hashlib
+import shutil
+import signal
+import time
+import tempfile
 from datetime import datetime
 
 from models.suitability_model import HydrogenSuitabilityModel
 from models.data_models import (
     SiteData, 
+    CriteriaWeights,
     SuitabilityRequest, 
     SuitabilityResponse,
     AnalysisRequest,
-    AnalysisResponse
+    AnalysisResponse,
+    RankRequest,
+    RankedSite,
+    RankResponse,
+    SensitivityRequest,
+    SensitivityResponse,
+    SpatialMatch,
+    ScenarioJobRequest,
+    JobStatus,
+    ScenarioJobResults,
+    IngestReport,
+    Recommendation,
+    RecommendationPage,
+    PolicyZone,
+    DemandCenter,
+    SiteDemand
 )
 from services.data_service import DataService
 from services.analysis_service import AnalysisService
+from services.score_cache import ScoreCache
+from services.site_scores import SiteScoreTable
+from services.site_store import POLICY_ZONES
+from services.spatial_index import GeoGridIndex
+from services.map_tiles import TileBuilder
+from services.suitability_raster import SuitabilityRaster
+from services.scoring_pool import ScoringPool
+from services.scenario_jobs import ScenarioJobManager
+from services.site_ingest import ingest_site_file
+from services.site_statistics import SiteStatistics
+from services.site_loader import SiteDataLoader
+from services.response_cache import ResponseCache, etag_matches
+from services.serialization import dump_models, dump_ndjson, dumps, parse_fields
+from services.recommendation_index import RecommendationIndex
+from services.sensitivity import SensitivityAnalyzer
+from services.demand_surface import DemandSurface
+from services.shared_state import SharedState
+from services.metrics import registry, stage, staged
+from services.profiler import SamplingProfiler
 from utils.config import get_settings
 
 # Configure logging
@@ -45,7 +89,196 @@ app.add_middleware(
 settings = get_settings()
 data_service = DataService()
 analysis_service = AnalysisService()
-suitability_model = HydrogenSuitabilityModel()
+site_loader = SiteDataLoader(
+    data_service,
+    max_concurrency=getattr(settings, "site_fetch_concurrency", 16)
+)
+suitability_model = HydrogenSuitabilityModel(
+    use_compiled_engine=getattr(settings, "use_compiled_engine", False)
+)
+score_cache = ScoreCache(
+    max_size=getattr(settings, "score_cache_size", 10000),
+    ttl_seconds=getattr(settings, "score_cache_ttl_seconds", 300.0)
+)
+site_scores = SiteScoreTable(suitability_model)
+site_index = GeoGridIndex(cell_size_deg=getattr(settings, "spatial_cell_size_deg", 0.5))
+tile_builder = TileBuilder(
+    site_scores,
+    site_index,
+    cluster_max_zoom=getattr(settings, "tile_cluster_max_zoom", 8)
+)
+tile_cache = ScoreCache(max_size=getattr(settings, "tile_cache_size", 4096), ttl_seconds=0)
+# Bumped once the spatial index has caught up with a site change; tiles are cached under it as well as the
+# table version, so a tile built against the old index while the update runs is never served afterwards
+spatial_index_version = 0
+suitability_raster: Optional[SuitabilityRaster] = None
+
+def _on_sites_changed(event: str, rows):
+    """Keep the spatial index and score cache in step with the site table"""
+    global spatial_index_version
+    if event == "rescore":
+        return
+    if event == "load" or len(rows) > getattr(settings, "spatial_rebuild_threshold", 1000):
+        site_index.build(site_scores.coordinates)
+        score_cache.clear()
+    else:
+        site_ids = site_scores.site_ids
+        for row in rows:
+            site_index.insert(int(row), *site_scores.coordinates[row])
+        score_cache.invalidate_sites(site_ids[row] for row in rows)
+    spatial_index_version += 1
+
+site_scores.add_change_listener(_on_sites_changed)
+site_statistics = SiteStatistics(site_scores)
+recommendation_index = RecommendationIndex(site_scores)
+demand_surface = DemandSurface(
+    site_scores,
+    radii_km=getattr(settings, "demand_radii_km", (100.0, 250.0, 500.0)),
+    scoring_radius_km=getattr(settings, "demand_scoring_radius_km", 250.0),
+    nearest_k=getattr(settings, "demand_nearest_k", 3),
+    horizon_years=getattr(settings, "demand_horizon_years", 0.0)
+)
+sensitivity_analyzer = SensitivityAnalyzer(
+    site_scores,
+    memory_bytes=getattr(settings, "sensitivity_memory_mb", 256) * 1024 * 1024
+)
+response_cache = ResponseCache(
+    max_entries=getattr(settings, "response_cache_size", 1024),
+    max_body_bytes=getattr(settings, "response_cache_max_body_bytes", 64 * 1024 * 1024),
+    compress_min_bytes=getattr(settings, "response_compress_min_bytes", 1024),
+    max_age_seconds=getattr(settings, "response_cache_max_age_seconds", 0)
+)
+# Entries are keyed on the data version already; clearing just frees the memory early
+site_scores.add_change_listener(lambda event, rows: response_cache.clear())
+scoring_pool = ScoringPool(
+    suitability_model,
+    mode=getattr(settings, "scoring_pool_mode", "thread"),
+    max_workers=getattr(settings, "scoring_pool_workers", 4),
+    max_concurrency=getattr(settings, "scoring_pool_max_concurrency", 8)
+)
+scenario_jobs = ScenarioJobManager(
+    site_scores,
+    jobs_dir=getattr(settings, "jobs_dir", "data/jobs"),
+    chunk_size=getattr(settings, "job_chunk_size", 10000),
+    max_workers=getattr(settings, "job_workers", 2)
+)
+# Production workers memory-map the model and site arrays published by the launcher (see __main__)
+shared_state_dir = getattr(settings, "shared_state_dir", None) or os.environ.get("H2_SHARED_STATE_DIR")
+shared_state = SharedState(
+    shared_state_dir,
+    site_scores,
+    demand_surface,
+    keep_generations=getattr(settings, "shared_state_keep_generations", 3),
+    poll_interval_s=getattr(settings, "shared_state_poll_interval_s", 2.0)
+) if shared_state_dir else None
+suitability_model.add_model_change_listener(score_cache.clear)
+suitability_model.add_model_change_listener(site_scores.refresh_base_scores)
+
+# Metrics: per-route latency plus gauges read from live caches and pools at scrape time
+REQUEST_LATENCY = registry.histogram(
+    "h2_request_latency_seconds",
+    "End-to-end HTTP request latency, until the last body chunk of the response is sent",
+    ("method", "route")
+)
+RESPONSE_SIZE = registry.histogram(
+    "h2_response_size_bytes",
+    "HTTP response body size as sent, including streamed bodies",
+    ("method", "route"),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+)
+CACHES = {"score": score_cache, "tile": tile_cache, "response": response_cache}
+for field, metric_type in (("size", "gauge"), ("hits", "counter"), ("misses", "counter"), ("evictions", "counter")):
+    registry.callback(
+        f"h2_cache_{field}" + ("_total" if metric_type == "counter" else ""),
+        f"Cache {field}",
+        metric_type,
+        ("cache",),
+        lambda field=field: {(name,): cache.stats()[field] for name, cache in CACHES.items()}
+    )
+for field, metric_type in (("queued", "gauge"), ("active", "gauge"), ("completed", "counter"), ("failed", "counter")):
+    registry.callback(
+        f"h2_scoring_pool_{field}" + ("_total" if metric_type == "counter" else ""),
+        f"Scoring pool {field} tasks",
+        metric_type,
+        ("mode",),
+        lambda field=field: {(scoring_pool.mode,): scoring_pool.stats()[field]}
+    )
+registry.callback("h2_sites", "Sites in the site table", "gauge", (), lambda: {(): len(site_scores)})
+for field, documentation in (
+    ("not_modified", "Conditional requests answered with 304"),
+    ("bytes_sent", "Response body bytes sent from the response cache"),
+    ("bytes_saved", "Bytes not sent thanks to compression and 304s"),
+    ("build_seconds_saved", "Build and serialization time avoided by response cache hits")
+):
+    registry.callback(
+        f"h2_response_cache_{field}_total",
+        documentation,
+        "counter",
+        (),
+        lambda field=field: {(): response_cache.stats()[field]}
+    )
+
+# Sampling profiler, toggled with SIGUSR2 or the /debug/profiler endpoints when enabled
+profiler = SamplingProfiler(interval_s=getattr(settings, "profiler_interval_s", 0.005))
+
+def _toggle_profiler(signum, frame):
+    if profiler.running:
+        profiler.stop()
+        output_path = getattr(settings, "profiler_output_path", "data/profile.collapsed")
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w") as f:
+            f.write(profiler.collapsed())
+        logger.info(f"Profile written to {output_path}")
+    else:
+        profiler.start()
+
+if hasattr(signal, "SIGUSR2"):
+    try:
+        signal.signal(signal.SIGUSR2, _toggle_profiler)
+    except ValueError:
+        # Not on the main thread (e.g. imported by a test harness)
+        pass
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    labels = (request.method, route.path if route is not None else "unmatched")
+    body_iterator = response.body_iterator
+    
+    async def observed_body():
+        # Streamed bodies (NDJSON batches) are only complete once the last chunk has been sent
+        size = 0
+        try:
+            async for chunk in body_iterator:
+                size += len(chunk)
+                yield chunk
+        finally:
+            REQUEST_LATENCY.observe(time.perf_counter() - start, *labels)
+            RESPONSE_SIZE.observe(size, *labels)
+    
+    response.body_iterator = observed_body()
+    return response
+
+async def load_local_state(train_if_missing: bool = False):
+    """Load the model and score every site in this process"""
+    # Never train inside a serving process; fall back to rule-based scores until an artifact exists
+    model_loaded = suitability_model.load_model(
+        train_if_missing=train_if_missing,
+        mmap_mode=getattr(settings, "model_mmap_mode", "r"),
+        startup_budget_s=getattr(settings, "model_startup_budget_s", 2.0)
+    )
+    if not model_loaded:
+        suitability_model.train_in_background()
+    
+    # Score every site once so re-weighting skips the model
+    site_scores.load(await data_service.get_all_sites())
+    
+    # Demand centres feed the demand criterion; without them it scores 0 everywhere
+    get_demand_centers = getattr(data_service, "get_demand_centers", None)
+    if get_demand_centers is not None:
+        demand_surface.set_centers(await get_demand_centers())
 
 @app.on_event("startup")
 async def startup_event():
@@ -53,9 +286,38 @@ async def startup_event():
     logger.info("Starting भारत H2-Atlas Backend...")
     await data_service.initialize()
     await analysis_service.initialize()
-    suitability_model.load_model()
+    attached = False
+    if shared_state is not None:
+        # The launcher has loaded and scored everything once; attach it and follow later generations
+        try:
+            attached = shared_state.refresh()
+        except Exception as e:
+            logger.error(f"Error attaching shared state: {str(e)}")
+        shared_state.start_watching()
+    if not attached:
+        await load_local_state()
+    
+    # Pick up scenario jobs interrupted by a previous shutdown
+    await scenario_jobs.resume_incomplete()
+    
+    # Attach the precomputed national raster if the offline stage has produced one
+    global suitability_raster
+    raster_path = getattr(settings, "suitability_raster_path", "data/suitability_raster")
+    if os.path.exists(os.path.join(raster_path, "manifest.json")):
+        try:
+            suitability_raster = SuitabilityRaster(raster_path, suitability_model)
+        except Exception as e:
+            logger.error(f"Error loading suitability raster: {str(e)}")
     logger.info("Backend initialized successfully!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release worker pools on shutdown"""
+    if shared_state is not None:
+        shared_state.stop_watching()
+    scenario_jobs.shutdown()
+    scoring_pool.shutdown()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -76,34 +338,111 @@ async def health_check():
             "data_service": "active",
             "analysis_service": "active",
             "suitability_model": "active"
-        }
+        },
+        "model_version": suitability_model.model_version,
+        "model_loading": suitability_model.loading_in_progress,
+        "model_training": suitability_model.training_in_progress or (
+            shared_state is not None and shared_state.training_in_progress
+        ),
+        "score_cache": score_cache.stats(),
+        "response_cache": response_cache.stats(),
+        "site_loader": site_loader.stats(),
+        "demand_surface": demand_surface.stats(),
+        "shared_state": shared_state.stats() if shared_state is not None else None,
+        "scoring_pool": scoring_pool.stats()
     }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profiler")
+async def profiler_report(limit: Optional[int] = Query(None, ge=1)):
+    """Collapsed stacks from the sampling profiler"""
+    _require_profiler_endpoints()
+    return PlainTextResponse(profiler.collapsed(limit), headers={"X-Profiler-Samples": str(profiler.sample_count)})
+
+@app.post("/debug/profiler/start")
+async def start_profiler(
+    duration_s: Optional[float] = Query(None, gt=0, le=3600),
+    interval_ms: Optional[float] = Query(None, ge=1, le=1000)
+):
+    """Start sampling stacks in this process"""
+    _require_profiler_endpoints()
+    if not profiler.start(duration_s, interval_ms / 1000 if interval_ms else None):
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    return profiler.status()
+
+@app.post("/debug/profiler/stop")
+async def stop_profiler():
+    """Stop sampling; the collected stacks stay available on /debug/profiler"""
+    _require_profiler_endpoints()
+    profiler.stop()
+    return profiler.status()
+
+def _require_profiler_endpoints():
+    if not getattr(settings, "enable_profiler_endpoints", False):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+def _require_local_state(action: str):
+    """Refuse writes that would only reach this worker's copy of shared, memory-mapped state"""
+    if shared_state is not None:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Cannot {action} while serving shared state; update the data source and relaunch to publish it to every worker"
+        )
+
+def _projection(model, fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Include spec for a `fields` query parameter; unknown fields are a client error"""
+    try:
+        return parse_fields(model, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/api/suitability/analyze", response_model=SuitabilityResponse)
-async def analyze_suitability(request: SuitabilityRequest):
+async def analyze_suitability(
+    request: SuitabilityRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, or 'score'")
+):
     """Analyze hydrogen site suitability using ML model"""
+    include = _projection(SuitabilityResponse, fields)
     try:
         logger.info(f"Analyzing suitability for site: {request.site_name}")
         
-        # Get enhanced site data
-        site_data = await data_service.get_enhanced_site_data(request.site_id)
-        if not site_data:
-            raise HTTPException(status_code=404, detail="Site not found")
-        
-        # Run ML analysis
-        suitability_score = suitability_model.predict_suitability(
-            site_data, 
-            request.criteria_weights
-        )
-        
-        # Generate detailed analysis
-        analysis = analysis_service.generate_suitability_analysis(
-            site_data, 
-            suitability_score, 
-            request.criteria_weights
+        cache_key = score_cache.make_key(
+            request.site_id,
+            request.criteria_weights,
+            suitability_model.model_version
         )
+        cached = score_cache.get(cache_key)
+        if cached is not None:
+            suitability_score, analysis = cached
+        else:
+            # Get enhanced site data
+            with stage("get_enhanced_site_data"):
+                site_data = await site_loader.get_enhanced_site_data(request.site_id)
+            if not site_data:
+                raise HTTPException(status_code=404, detail="Site not found")
+            
+            suitability_score = float((await _score_sites(
+                [request.site_id],
+                [site_data],
+                request.criteria_weights
+            ))[0])
+            
+            # Generate detailed analysis
+            # Timed on the pool thread, so queueing for a slot is not counted as analysis time
+            analysis = await scoring_pool.run(
+                staged("generate_suitability_analysis", analysis_service.generate_suitability_analysis),
+                site_data, 
+                suitability_score, 
+                request.criteria_weights
+            )
+            score_cache.put(cache_key, (suitability_score, analysis))
         
-        return SuitabilityResponse(
+        # Built from validated parts, so it is not validated again here or by response_model
+        response = SuitabilityResponse.model_construct(
             site_id=request.site_id,
             site_name=request.site_name,
             suitability_score=suitability_score,
@@ -111,103 +450,559 @@ async def analyze_suitability(request: SuitabilityRequest):
             timestamp=datetime.now().isoformat()
         )
         
+        # Serialize here rather than in FastAPI so the stage shows up in the metrics
+        with stage("serialization"):
+            body = response.model_dump_json(include=include)
+        return Response(content=body, media_type="application/json")
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error analyzing suitability: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _score_sites(site_ids: List[str], sites: List[SiteData], weights: CriteriaWeights) -> np.ndarray:
+    """Score sites from the stored base scores; only sites missing from the table go through the model"""
+    rows = site_scores.rows_for(site_ids)
+    known = rows >= 0
+    scores = np.empty(len(site_ids))
+    if known.any():
+        # Stored base scores plus one dot product with the weights
+        scores[known] = site_scores.score_rows(rows[known], weights)
+    if not known.all():
+        missing = np.flatnonzero(~known)
+        # Sites outside the table have no demand criterion
+        demand = np.zeros(len(missing), dtype=np.float32) if weights.demand else None
+        scores[missing] = await scoring_pool.score_sites([sites[i] for i in missing], weights, demand)
+    return scores
+
+def _build_responses(fetched: List, suitability_scores, weights: CriteriaWeights) -> List[SuitabilityResponse]:
+    """Generate analyses and responses for scored sites"""
+    results = []
+    timestamp = datetime.now().isoformat()
+    for (site, site_data), suitability_score in zip(fetched, suitability_scores):
+        # Generate analysis
+        analysis = analysis_service.generate_suitability_analysis(
+            site_data, 
+            float(suitability_score), 
+            weights
+        )
+        
+        results.append(SuitabilityResponse.model_construct(
+            site_id=site.site_id,
+            site_name=site.site_name,
+            suitability_score=float(suitability_score),
+            analysis=analysis,
+            timestamp=timestamp
+        ))
+    
+    return results
+
+async def _analyze_sites(sites: List[SuitabilityRequest], weights: CriteriaWeights) -> List[SuitabilityResponse]:
+    """Fetch, score and analyze a group of sites with a single model pass"""
+    # Get enhanced site data in one round trip, fetching each distinct site once
+    with stage("get_enhanced_site_data"):
+        site_data_list = await site_loader.get_enhanced_site_data_many([site.site_id for site in sites])
+    fetched = [(site, site_data) for site, site_data in zip(sites, site_data_list) if site_data]
+    
+    suitability_scores = await _score_sites(
+        [site.site_id for site, _ in fetched],
+        [site_data for _, site_data in fetched],
+        weights
+    )
+    
+    return await scoring_pool.run(_build_responses, fetched, suitability_scores, weights)
+
 @app.post("/api/suitability/batch", response_model=List[SuitabilityResponse])
-async def batch_suitability_analysis(request: AnalysisRequest):
+async def batch_suitability_analysis(
+    request: AnalysisRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, or 'score'")
+):
     """Batch analyze multiple sites for suitability"""
+    include = _projection(SuitabilityResponse, fields)
     try:
         logger.info(f"Batch analyzing {len(request.sites)} sites")
+        results = await _analyze_sites(request.sites, request.criteria_weights)
         
-        results = []
-        for site in request.sites:
-            # Get enhanced site data
-            site_data = await data_service.get_enhanced_site_data(site.site_id)
-            if site_data:
-                # Run ML analysis
-                suitability_score = suitability_model.predict_suitability(
-                    site_data, 
-                    request.criteria_weights
-                )
-                
-                # Generate analysis
-                analysis = analysis_service.generate_suitability_analysis(
-                    site_data, 
-                    suitability_score, 
-                    request.criteria_weights
-                )
-                
-                results.append(SuitabilityResponse(
-                    site_id=site.site_id,
-                    site_name=site.site_name,
-                    suitability_score=suitability_score,
-                    analysis=analysis,
-                    timestamp=datetime.now().isoformat()
-                ))
-        
-        return results
+        body = await scoring_pool.run(staged("serialization", dump_models), SuitabilityResponse, results, include)
+        return Response(content=body, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error in batch analysis: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/suitability/batch/stream")
+async def stream_batch_suitability_analysis(
+    request: AnalysisRequest,
+    http_request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, or 'score'")
+):
+    """Batch analyze sites, streaming each result as newline-delimited JSON"""
+    include = _projection(SuitabilityResponse, fields)
+    logger.info(f"Streaming batch analysis of {len(request.sites)} sites")
+    chunk_size = getattr(settings, "stream_chunk_size", 100)
+    
+    async def generate_results():
+        # Only one chunk of results is held in memory at a time
+        for start in range(0, len(request.sites), chunk_size):
+            if await http_request.is_disconnected():
+                logger.info(f"Client disconnected after {start} sites; stopping batch stream")
+                return
+            
+            try:
+                results = await _analyze_sites(request.sites[start:start + chunk_size], request.criteria_weights)
+            except Exception as e:
+                logger.error(f"Error in streaming batch analysis: {str(e)}")
+                yield json.dumps({"error": str(e)}) + "\n"
+                return
+            
+            yield dump_ndjson(results, include)
+    
+    return StreamingResponse(generate_results(), media_type="application/x-ndjson")
+
+@app.post("/api/suitability/rank", response_model=RankResponse)
+async def rank_sites(
+    request: RankRequest,
+    fields: Optional[str] = Query(None, description="Comma-separated site fields to return, or 'score'")
+):
+    """Rank every known site under the given weights and return the top-k"""
+    site_include = _projection(RankedSite, fields)
+    try:
+        rows, scores, total_candidates = site_scores.top_k(
+            request.criteria_weights,
+            request.k,
+            state=request.state,
+            policy_zone=request.policy_zone.value if request.policy_zone else None,
+            land_type=request.land_type.value if request.land_type else None
+        )
+        
+        sites = [
+            RankedSite.model_construct(
+                rank=rank,
+                suitability_score=float(score),
+                **site_scores.describe(row)
+            )
+            for rank, (row, score) in enumerate(zip(rows, scores), start=1)
+        ]
+        
+        response = RankResponse.model_construct(
+            total_candidates=total_candidates,
+            sites=sites,
+            timestamp=datetime.now().isoformat()
+        )
+        include = None
+        if site_include is not None:
+            include = {"total_candidates": True, "sites": {"__all__": site_include}, "timestamp": True}
+        return Response(content=response.model_dump_json(include=include), media_type="application/json")
+        
+    except Exception as e:
+        logger.error(f"Error ranking sites: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/suitability/sensitivity", response_model=SensitivityResponse)
+async def weight_sensitivity(request: SensitivityRequest):
+    """Rank stability of sites when the criteria weights are perturbed by random sampling"""
+    try:
+        logger.info(f"Sensitivity analysis with {request.samples} weight samples")
+        result = await scoring_pool.run(
+            sensitivity_analyzer.analyze,
+            request.criteria_weights,
+            request.samples,
+            request.method,
+            request.concentration,
+            request.spread,
+            request.site_ids,
+            request.k,
+            request.state,
+            request.policy_zone.value if request.policy_zone else None,
+            request.land_type.value if request.land_type else None,
+            request.seed
+        )
+        return SensitivityResponse(**result, timestamp=datetime.now().isoformat())
+        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in sensitivity analysis: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _spatial_matches(rows, distances=None) -> List[SpatialMatch]:
+    """Compact payloads for site table rows returned by the spatial index"""
+    return [
+        SpatialMatch(
+            site_id=site_scores.site_ids[row],
+            site_name=site_scores.names[row],
+            coordinates=site_scores.coordinates[row].tolist(),
+            distance_km=float(distances[i]) if distances is not None else None
+        )
+        for i, row in enumerate(rows)
+    ]
+
+@app.get("/api/spatial/radius", response_model=List[SpatialMatch])
+async def sites_within_radius(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(50, gt=0)
+):
+    """Get sites within a radius of a point, nearest first"""
+    try:
+        rows, distances = site_index.radius(lat, lon, radius_km)
+        return _spatial_matches(rows, distances)
+    except Exception as e:
+        logger.error(f"Error in radius search: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/spatial/nearest", response_model=List[SpatialMatch])
+async def nearest_sites(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=1000)
+):
+    """Get the k sites nearest to a point"""
+    try:
+        rows, distances = site_index.nearest(lat, lon, k)
+        return _spatial_matches(rows, distances)
+    except Exception as e:
+        logger.error(f"Error in nearest search: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/spatial/bbox", response_model=List[SpatialMatch])
+async def sites_in_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180)
+):
+    """Get sites inside a bounding box, e.g. the current map viewport"""
+    try:
+        rows = site_index.bbox(min_lat, min_lon, max_lat, max_lon)
+        return _spatial_matches(rows)
+    except Exception as e:
+        logger.error(f"Error in bounding box search: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _build_site_tile(z: int, x: int, y: int):
+    """Serialized tile body and its ETag"""
+    body = dumps(tile_builder.build(z, x, y))
+    return '"' + hashlib.sha1(body).hexdigest() + '"', body
+
+@app.get("/api/tiles/{z}/{x}/{y}")
+async def get_site_tile(z: int, x: int, y: int, request: Request):
+    """Get the sites in an XYZ map tile, clustered at low zoom levels"""
+    if not (0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+    
+    try:
+        cache_key = (z, x, y, site_scores.version, spatial_index_version)
+        cached = tile_cache.get(cache_key)
+        if cached is None:
+            cached = await scoring_pool.run(_build_site_tile, z, x, y)
+            tile_cache.put(cache_key, cached)
+        etag, body = cached
+        
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={getattr(settings, 'tile_max_age_seconds', 300)}"
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+        
+    except Exception as e:
+        logger.error(f"Error building tile {z}/{x}/{y}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _require_raster() -> SuitabilityRaster:
+    if suitability_raster is None:
+        raise HTTPException(status_code=503, detail="Suitability raster has not been built")
+    return suitability_raster
+
+def _build_raster_window(raster: SuitabilityRaster, bounds, weights: CriteriaWeights, step: int) -> bytes:
+    """Serialized raster window, capped at raster_window_max_cells cells"""
+    window = raster.window(
+        *bounds, weights, step=step, max_cells=getattr(settings, "raster_window_max_cells", 100_000)
+    )
+    return dumps(window)
+
+@app.get("/api/raster/window")
+async def get_raster_window(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    step: int = Query(1, ge=1, le=100),
+    weights: CriteriaWeights = Depends()
+):
+    """Get re-weighted suitability values for a window of the national raster; large windows are coarsened"""
+    raster = _require_raster()
+    try:
+        body = await scoring_pool.run(
+            _build_raster_window, raster, (min_lat, min_lon, max_lat, max_lon), weights, step
+        )
+        return Response(content=body, media_type="application/json")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reading raster window: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/raster/tiles/{z}/{x}/{y}.png")
+async def get_raster_tile(z: int, x: int, y: int, weights: CriteriaWeights = Depends()):
+    """Get a heatmap PNG tile of the national suitability raster"""
+    raster = _require_raster()
+    if not (0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+    
+    try:
+        cache_key = ("raster", z, x, y, ScoreCache.weights_hash(weights), id(raster))
+        png = tile_cache.get(cache_key)
+        if png is None:
+            png = await scoring_pool.run(raster.render_tile, z, x, y, weights)
+            tile_cache.put(cache_key, png)
+        return Response(
+            content=png,
+            media_type="image/png",
+            headers={"Cache-Control": f"public, max-age={getattr(settings, 'tile_max_age_seconds', 300)}"}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error rendering raster tile {z}/{x}/{y}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/jobs/scenarios", response_model=JobStatus, status_code=202)
+async def submit_scenario_job(request: ScenarioJobRequest):
+    """Submit a set of weight scenarios to score over the full site catalogue"""
+    try:
+        job_id = await scenario_jobs.submit(request.scenarios, top_k=request.top_k)
+        return scenario_jobs.status(job_id)
+    except Exception as e:
+        logger.error(f"Error submitting scenario job: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/jobs/{job_id}", response_model=JobStatus)
+async def get_job_status(job_id: str):
+    """Get the progress of a scenario job"""
+    status = scenario_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return status
+
+@app.get("/api/jobs/{job_id}/results", response_model=ScenarioJobResults)
+async def get_job_results(job_id: str):
+    """Get the results of a completed scenario job"""
+    status = scenario_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    results = scenario_jobs.results(job_id)
+    if results is None:
+        raise HTTPException(status_code=409, detail=f"Job is {status['status']}")
+    return results
+
+@app.post("/api/model/retrain", status_code=202)
+async def retrain_model():
+    """Retrain the suitability model in a separate process and hot-swap it in when ready"""
+    try:
+        data_path = getattr(settings, "training_data_path", None)
+        if shared_state is not None and shared_state.generation is not None:
+            # Publish the new model as a generation so every worker swaps to it
+            shared_state.retrain(data_path)
+        else:
+            suitability_model.retrain_model(data_path)
+        return {
+            "status": "training",
+            "model_version": suitability_model.model_version,
+            "timestamp": datetime.now().isoformat()
+        }
+    except Exception as e:
+        logger.error(f"Error starting model retraining: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/sites/ingest", response_model=IngestReport)
+async def ingest_sites(file: UploadFile = File(...)):
+    """Bulk-load a CSV or Parquet site catalogue into the site store"""
+    _require_local_state("ingest sites")
+    suffix = os.path.splitext(file.filename or "")[1].lower()
+    if suffix not in (".csv", ".parquet", ".pq"):
+        raise HTTPException(status_code=400, detail="Expected a .csv or .parquet file")
+    
+    try:
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            shutil.copyfileobj(file.file, tmp)
+        try:
+            return await scoring_pool.run(
+                ingest_site_file,
+                tmp.name,
+                site_scores,
+                getattr(settings, "ingest_chunk_size", 100_000)
+            )
+        finally:
+            os.remove(tmp.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error ingesting sites: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/sites", response_model=List[SiteData])
-async def get_all_sites():
+async def get_all_sites(request: Request):
     """Get all hydrogen sites with enhanced data"""
     try:
-        sites = await data_service.get_all_sites()
-        return sites
+        # Records are materialized and serialized only when the site data changed
+        return await response_cache.respond(
+            request, site_scores.version, site_scores.store.records, run=scoring_pool.run
+        )
     except Exception as e:
         logger.error(f"Error fetching sites: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/sites/{site_id}", response_model=SiteData)
-async def get_site_by_id(site_id: str):
+async def get_site_by_id(site_id: str, request: Request):
     """Get specific site by ID"""
     try:
+        version = site_scores.version
+        row = site_scores.store.position(site_id)
+        if row is not None:
+            return await response_cache.respond(request, version, lambda: site_scores.store.record(row))
+        
         site = await data_service.get_site_by_id(site_id)
         if not site:
             raise HTTPException(status_code=404, detail="Site not found")
         return site
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching site {site_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/analysis/recommendations")
+@app.get("/api/sites/{site_id}/demand", response_model=SiteDemand)
+async def get_site_demand(site_id: str):
+    """Get the hydrogen demand reachable from a site and its nearest demand centres"""
+    row = site_scores.store.position(site_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail="Site not found")
+    try:
+        return demand_surface.site_demand(row)
+    except Exception as e:
+        logger.error(f"Error reading demand for site {site_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/demand/centers", response_model=List[DemandCenter])
+async def get_demand_centers():
+    """Get the demand centres used for the demand criterion"""
+    return demand_surface.centers
+
+@app.put("/api/demand/centers")
+async def set_demand_centers(centers: List[DemandCenter]):
+    """Replace the demand centres and recompute the demand surface for every site"""
+    _require_local_state("replace demand centres")
+    try:
+        await scoring_pool.run(demand_surface.set_centers, centers)
+        # Cached analyses may have been scored with the previous demand criterion
+        score_cache.clear()
+        return demand_surface.stats()
+    except Exception as e:
+        logger.error(f"Error updating demand centres: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/analysis/recommendations", response_model=RecommendationPage)
 async def get_recommendations(
     state: Optional[str] = None,
+    policy_zone: Optional[PolicyZone] = None,
     min_score: Optional[float] = None,
-    max_score: Optional[float] = None
+    max_score: Optional[float] = None,
+    limit: int = Query(50, ge=1, le=500, description="Page size"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
 ):
-    """Get site recommendations based on criteria"""
+    """Get site recommendations based on criteria, best first and paginated"""
     try:
-        recommendations = await analysis_service.get_recommendations(
+        page, total, next_cursor = recommendation_index.query(
             state=state,
+            policy_zone=policy_zone.value if policy_zone else None,
             min_score=min_score,
-            max_score=max_score
+            max_score=max_score,
+            limit=limit,
+            cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        columns = site_scores.store.columns
+        return RecommendationPage(
+            total=total,
+            recommendations=[
+                Recommendation(
+                    policy_zone=POLICY_ZONES[columns['policy_zone_code'][row]],
+                    suitability_score=score,
+                    **site_scores.describe(row)
+                )
+                for row, score in page
+            ],
+            next_cursor=next_cursor,
+            timestamp=datetime.now().isoformat()
         )
-        return recommendations
     except Exception as e:
         logger.error(f"Error getting recommendations: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/analysis/statistics")
-async def get_analysis_statistics():
+async def get_analysis_statistics(request: Request):
     """Get overall analysis statistics"""
     try:
-        stats = await analysis_service.get_statistics()
-        return stats
+        # Maintained incrementally from site table changes
+        return await response_cache.respond(request, site_statistics.version, site_statistics.statistics)
     except Exception as e:
         logger.error(f"Error getting statistics: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _publish_shared_state(root: str) -> str:
+    await data_service.initialize()
+    # Training here, once, is fine: the launcher does not serve requests
+    await load_local_state(train_if_missing=True)
+    return SharedState(
+        root,
+        site_scores,
+        demand_surface,
+        keep_generations=getattr(settings, "shared_state_keep_generations", 3)
+    ).publish()
+
+def publish_shared_state(root: str) -> str:
+    """Load the model and score every site once, and publish them as the current shared generation"""
+    return asyncio.run(_publish_shared_state(root))
+
 if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info"
+    import argparse
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    parser = argparse.ArgumentParser(description="Run the H2-Atlas API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Worker processes; more than one runs in production mode over shared, memory-mapped state"
     )
+    parser.add_argument("--shared-state-dir", default=shared_state_dir or "data/shared")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Publish from a short-lived process so the supervisor never holds the sites or the model
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            executor.submit(publish_shared_state, args.shared_state_dir).result()
+        os.environ["H2_SHARED_STATE_DIR"] = args.shared_state_dir
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            log_level="info"
+        )
+    else:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            reload=True,
+            log_level="info"
+        )
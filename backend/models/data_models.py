@@ -28,6 +28,10 @@ class InfrastructureType(str, Enum):
     INDUSTRIAL_PARK = "Industrial Park"
     TECH_HUB = "Tech Hub"
 
+class WeightSampling(str, Enum):
+    DIRICHLET = "dirichlet"
+    UNIFORM = "uniform"
+
 class SiteData(BaseModel):
     """Enhanced hydrogen site data model"""
     id: str = Field(..., description="Unique site identifier")
@@ -82,6 +86,7 @@ class CriteriaWeights(BaseModel):
     industry_proximity: float = Field(15, ge=0, le=100, description="Industry proximity weight (%)")
     grid_proximity: float = Field(10, ge=0, le=100, description="Grid proximity weight (%)")
     land_availability: float = Field(5, ge=0, le=100, description="Land availability weight (%)")
+    demand: float = Field(0, ge=0, le=100, description="Reachable hydrogen demand weight (%)")
     
     @validator('*')
     def validate_weights(cls, v):
@@ -100,6 +105,28 @@ class AnalysisRequest(BaseModel):
     sites: List[SuitabilityRequest] = Field(..., description="List of sites to analyze")
     criteria_weights: CriteriaWeights = Field(..., description="Criteria weights for analysis")
 
+class RankRequest(BaseModel):
+    """Request for ranking the full site catalogue under given weights"""
+    criteria_weights: CriteriaWeights = Field(..., description="Criteria weights for analysis")
+    state: Optional[str] = Field(None, description="Only rank sites in this state")
+    policy_zone: Optional[PolicyZone] = Field(None, description="Only rank sites in this policy zone")
+    land_type: Optional[LandType] = Field(None, description="Only rank sites of this land type")
+    k: int = Field(50, ge=1, le=1000, description="Number of top sites to return")
+
+class SensitivityRequest(BaseModel):
+    """Request for rank stability of sites under sampled perturbations of the criteria weights"""
+    criteria_weights: CriteriaWeights = Field(..., description="Central criteria weights")
+    samples: int = Field(500, ge=1, le=10000, description="Number of weight vectors to sample")
+    method: WeightSampling = Field(WeightSampling.DIRICHLET, description="Weight sampling method")
+    concentration: float = Field(100, gt=0, description="Dirichlet concentration; higher stays closer to the given weights")
+    spread: float = Field(0.2, ge=0, le=1, description="Uniform sampling: maximum relative change of each weight")
+    site_ids: Optional[List[str]] = Field(None, max_length=1000, description="Sites to report; defaults to the current top-k")
+    state: Optional[str] = Field(None, description="Only rank sites in this state")
+    policy_zone: Optional[PolicyZone] = Field(None, description="Only rank sites in this policy zone")
+    land_type: Optional[LandType] = Field(None, description="Only rank sites of this land type")
+    k: int = Field(10, ge=1, le=1000, description="Top-k cut-off for the probability of ranking in the top-k")
+    seed: Optional[int] = Field(None, description="Random seed for reproducible samples")
+
 class SuitabilityAnalysis(BaseModel):
     """Detailed suitability analysis results"""
     overall_score: float = Field(..., description="Overall suitability score (0-100)")
@@ -133,6 +160,105 @@ class SuitabilityResponse(BaseModel):
     analysis: SuitabilityAnalysis = Field(..., description="Detailed analysis")
     timestamp: str = Field(..., description="Analysis timestamp")
 
+class RankedSite(BaseModel):
+    """Compact ranking entry for a site"""
+    rank: int = Field(..., description="Rank among matching sites (1 = best)")
+    site_id: str = Field(..., description="Site ID")
+    site_name: str = Field(..., description="Site name")
+    state: str = Field(..., description="Indian state")
+    coordinates: List[float] = Field(..., description="[latitude, longitude]")
+    suitability_score: float = Field(..., description="Calculated suitability score")
+
+class Recommendation(BaseModel):
+    """Site matching a recommendation query"""
+    site_id: str = Field(..., description="Site ID")
+    site_name: str = Field(..., description="Site name")
+    state: str = Field(..., description="Indian state")
+    policy_zone: PolicyZone = Field(..., description="Policy zone classification")
+    coordinates: List[float] = Field(..., description="[latitude, longitude]")
+    suitability_score: float = Field(..., description="Suitability score")
+
+class RecommendationPage(BaseModel):
+    """One page of recommendations, best first"""
+    total: Optional[int] = Field(None, description="Total matching sites, when known without a scan")
+    recommendations: List[Recommendation] = Field(..., description="Matching sites on this page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page, absent on the last page")
+    timestamp: str = Field(..., description="Query timestamp")
+
+class RankResponse(BaseModel):
+    """Response for site ranking"""
+    total_candidates: int = Field(..., description="Number of sites matching the filters")
+    sites: List[RankedSite] = Field(..., description="Top-k sites, best first")
+    timestamp: str = Field(..., description="Analysis timestamp")
+
+class SiteSensitivity(BaseModel):
+    """Rank stability of one site across the sampled weight vectors"""
+    site_id: str = Field(..., description="Site ID")
+    site_name: str = Field(..., description="Site name")
+    state: str = Field(..., description="Indian state")
+    coordinates: List[float] = Field(..., description="[latitude, longitude]")
+    baseline_rank: int = Field(..., description="Rank under the given weights (1 = best)")
+    baseline_score: float = Field(..., description="Suitability score under the given weights")
+    mean_score: float = Field(..., description="Mean suitability score across samples")
+    rank_percentiles: Dict[str, float] = Field(..., description="Rank at the 5th, 25th, 50th, 75th and 95th percentiles")
+    probability_top_k: float = Field(..., description="Fraction of samples in which the site ranks in the top-k")
+
+class SensitivityResponse(BaseModel):
+    """Response for weight sensitivity analysis"""
+    total_candidates: int = Field(..., description="Number of sites matching the filters")
+    samples: int = Field(..., description="Number of weight vectors sampled")
+    k: int = Field(..., description="Top-k cut-off used for probability_top_k")
+    sites: List[SiteSensitivity] = Field(..., description="Reported sites, in baseline rank order")
+    timestamp: str = Field(..., description="Analysis timestamp")
+
+class SpatialMatch(BaseModel):
+    """Site returned by a geographic query"""
+    site_id: str = Field(..., description="Site ID")
+    site_name: str = Field(..., description="Site name")
+    coordinates: List[float] = Field(..., description="[latitude, longitude]")
+    distance_km: Optional[float] = Field(None, description="Distance from the query point (km)")
+
+class ScenarioJobRequest(BaseModel):
+    """Request to score the full site catalogue under several weight scenarios"""
+    scenarios: Dict[str, CriteriaWeights] = Field(..., min_length=1, description="Named criteria weight scenarios")
+    top_k: int = Field(50, ge=1, le=1000, description="Number of top sites to report per scenario")
+
+class JobStatus(BaseModel):
+    """Progress of an asynchronous job"""
+    job_id: str = Field(..., description="Job ID")
+    status: str = Field(..., description="Job status (queued/running/completed/failed)")
+    completed_chunks: int = Field(..., description="Number of finished work chunks")
+    total_chunks: int = Field(..., description="Total number of work chunks")
+    progress: float = Field(..., description="Fraction of work completed (0-1)")
+    created_at: str = Field(..., description="Submission timestamp")
+    updated_at: str = Field(..., description="Last status change timestamp")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+
+class ScenarioResult(BaseModel):
+    """Summary of one weight scenario"""
+    scenario: str = Field(..., description="Scenario name")
+    mean_score: Optional[float] = Field(None, description="Mean suitability score across sites")
+    top_sites: List[RankedSite] = Field(..., description="Top-k sites, best first")
+
+class ScenarioJobResults(BaseModel):
+    """Results of a scenario job"""
+    job_id: str = Field(..., description="Job ID")
+    scenarios: List[ScenarioResult] = Field(..., description="Per-scenario results")
+
+class IngestRejection(BaseModel):
+    """A row rejected during bulk ingestion"""
+    row: int = Field(..., description="Zero-based data row number in the file")
+    id: Optional[str] = Field(None, description="Site ID of the row, if present")
+    reasons: List[str] = Field(..., description="Failed checks")
+
+class IngestReport(BaseModel):
+    """Result of a bulk site ingestion"""
+    accepted: int = Field(..., description="Rows loaded into the site store")
+    rejected: int = Field(..., description="Rows rejected by validation")
+    rejection_reasons: Dict[str, int] = Field(..., description="Rejected row count per failed check")
+    rejections: List[IngestRejection] = Field(..., description="Sample of rejected rows")
+    elapsed_seconds: float = Field(..., description="Ingestion wall time")
+
 class DemandCenter(BaseModel):
     """Hydrogen demand center model"""
     id: str = Field(..., description="Demand center ID")
@@ -143,6 +269,20 @@ class DemandCenter(BaseModel):
     annual_demand: float = Field(..., description="Annual hydrogen demand (tons)")
     growth_rate: float = Field(..., description="Expected growth rate (%)")
 
+class NearbyDemandCenter(BaseModel):
+    """Demand center near a site"""
+    center_id: str = Field(..., description="Demand center ID")
+    name: str = Field(..., description="Demand center name")
+    distance_km: float = Field(..., description="Great-circle distance from the site (km)")
+    annual_demand: float = Field(..., description="Annual hydrogen demand at the planning horizon (tons)")
+
+class SiteDemand(BaseModel):
+    """Hydrogen demand reachable from a site"""
+    site_id: str = Field(..., description="Site ID")
+    reachable_demand: Dict[str, float] = Field(..., description="Distance-weighted demand (tons/year) within each radius, keyed by radius in km")
+    demand_score: float = Field(..., description="Demand criterion: reachable demand within the scoring radius relative to the largest centre (0-1)")
+    nearest_centers: List[NearbyDemandCenter] = Field(..., description="Nearest demand centers, closest first")
+
 class PolicyIncentive(BaseModel):
     """Policy incentive model"""
     id: str = Field(..., description="Incentive ID")
@@ -0,0 +1,206 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from models.data_models import DemandCenter
+from services.site_scores import SiteScoreTable
+from services.site_store import SiteStore
+from services.spatial_index import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+# Dot products, the in-reach mask and, when every centre is in reach, the index, distance
+# and weight arrays of every pair; per site-centre pair
+BYTES_PER_PAIR = 56
+
+def _unit_vectors(coordinates: np.ndarray) -> np.ndarray:
+    """[lat, lon] rows in degrees as 3D unit vectors"""
+    lat, lon = np.radians(coordinates[:, 0]), np.radians(coordinates[:, 1])
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+def _great_circle_km(dots: np.ndarray) -> np.ndarray:
+    """Great-circle distance between unit vectors with the given dot products"""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip((1 - dots) / 2, 0, 1)))
+
+class DemandSurface:
+    """Distance-weighted hydrogen demand reachable from every site, kept in step with the site table"""
+    
+    def __init__(self, table: SiteScoreTable, radii_km: Sequence[float] = (100.0, 250.0, 500.0),
+                 scoring_radius_km: float = 250.0, nearest_k: int = 3, horizon_years: float = 0.0,
+                 block_bytes: int = 64 * 1024 * 1024):
+        self.table = table
+        self.radii_km = np.array(sorted(set(radii_km) | {scoring_radius_km}), dtype=float)
+        # Reachable demand within this radius, relative to the largest single centre, is the demand criterion
+        self.scoring_radius_km = scoring_radius_km
+        self._scoring_column = int(np.flatnonzero(self.radii_km == scoring_radius_km)[0])
+        self.nearest_k = nearest_k
+        # Centre demand is projected this many years ahead at its growth rate
+        self.horizon_years = horizon_years
+        # Upper bound on the sites x centres block held at once
+        self.block_bytes = block_bytes
+        self._lock = threading.Lock()
+        self.version = 0
+        self.compute_seconds = 0.0
+        # Site store the current arrays were attached for rather than computed from
+        self._attached_store = None
+        self._set_centers([])
+        self._reset(0)
+        table.add_change_listener(self._on_change)
+    
+    def _set_centers(self, centers: List[DemandCenter]):
+        self.centers = list(centers)
+        self._center_vectors = _unit_vectors(
+            np.array([center.coordinates for center in centers], dtype=float).reshape(-1, 2)
+        )
+        self._center_demand = np.array([
+            center.annual_demand * (1 + center.growth_rate / 100) ** self.horizon_years
+            for center in centers
+        ], dtype=float)
+        self.total_demand = float(self._center_demand.sum())
+        self.max_center_demand = float(self._center_demand.max()) if len(centers) else 0.0
+    
+    def _reset(self, n_sites: int):
+        self.reachable = np.zeros((n_sites, len(self.radii_km)))
+        self.nearest = np.full((n_sites, self.nearest_k), -1, dtype=np.int32)
+        self.nearest_km = np.full((n_sites, self.nearest_k), np.nan, dtype=np.float32)
+    
+    def set_centers(self, centers: List[DemandCenter]):
+        """Replace the demand centres and recompute every site"""
+        with self._lock:
+            self._set_centers(centers)
+            self._reset(len(self.table))
+        self.update(np.arange(len(self.table)))
+        logger.info(f"Demand surface rebuilt for {len(centers)} demand centres")
+    
+    def attach(self, centers: List[DemandCenter], reachable: np.ndarray, nearest: np.ndarray,
+               nearest_km: np.ndarray, store: SiteStore):
+        """Adopt a surface computed elsewhere for store, e.g. memory-mapped from a shared snapshot"""
+        with self._lock:
+            self._set_centers(centers)
+            self.reachable, self.nearest, self.nearest_km = reachable, nearest, nearest_km
+            self._attached_store = store
+            self.version += 1
+    
+    def _compute(self, coordinates: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Reachable demand per radius and the nearest centres for each [lat, lon] row"""
+        n_sites, n_centers = len(coordinates), len(self.centers)
+        reachable = np.zeros((n_sites, len(self.radii_km)))
+        nearest = np.full((n_sites, self.nearest_k), -1, dtype=np.int32)
+        nearest_km = np.full((n_sites, self.nearest_k), np.nan, dtype=np.float32)
+        if n_sites == 0 or n_centers == 0:
+            return reachable, nearest, nearest_km
+        
+        k = min(self.nearest_k, n_centers)
+        # Centres farther than the largest radius contribute nothing, which is a dot product threshold
+        min_dot = np.cos(min(self.radii_km[-1] / EARTH_RADIUS_KM, np.pi))
+        block = max(1, self.block_bytes // (BYTES_PER_PAIR * n_centers))
+        for start in range(0, n_sites, block):
+            # Unit-vector dot products order sites by great-circle distance in one matrix product,
+            # so trigonometry is only needed for the nearest centres and the pairs within reach
+            dots = _unit_vectors(coordinates[start:start + block]) @ self._center_vectors.T
+            
+            sites_in_reach, centers_in_reach = np.nonzero(dots >= min_dot)
+            distances = _great_circle_km(dots[sites_in_reach, centers_in_reach])
+            demand = self._center_demand[centers_in_reach]
+            for column, radius in enumerate(self.radii_km):
+                # Demand counts in full at the site and decays linearly to nothing at the radius
+                weights = np.maximum(1 - distances / radius, 0) * demand
+                reachable[start:start + block, column] = np.bincount(sites_in_reach, weights=weights, minlength=len(dots))
+            del sites_in_reach, centers_in_reach, distances, demand
+            
+            # For a handful of neighbours, repeated row maxima are cheaper than partitioning every row
+            block_rows = np.arange(len(dots))
+            for j in range(k):
+                closest = dots.argmax(axis=1)
+                nearest[start:start + block, j] = closest
+                nearest_km[start:start + block, j] = _great_circle_km(dots[block_rows, closest])
+                dots[block_rows, closest] = -np.inf
+        return reachable, nearest, nearest_km
+    
+    def update(self, rows: np.ndarray):
+        """Recompute the given table rows and hand their demand criterion to the table"""
+        rows = np.asarray(rows, dtype=np.intp)
+        start = time.perf_counter()
+        with self._lock:
+            store = self.table.store
+            n_rows = len(store)
+            if len(self.reachable) < n_rows:
+                grow = n_rows - len(self.reachable)
+                self.reachable = np.concatenate([self.reachable, np.zeros((grow, len(self.radii_km)))])
+                self.nearest = np.concatenate([self.nearest, np.full((grow, self.nearest_k), -1, dtype=np.int32)])
+                self.nearest_km = np.concatenate([
+                    self.nearest_km, np.full((grow, self.nearest_k), np.nan, dtype=np.float32)
+                ])
+            if not len(rows):
+                return
+            
+            reachable, nearest, nearest_km = self._compute(store.coordinates[rows])
+            self.reachable[rows] = reachable
+            self.nearest[rows] = nearest
+            self.nearest_km[rows] = nearest_km
+            demand = self._demand_scores(reachable)
+            self.version += 1
+            self.compute_seconds = time.perf_counter() - start
+        self.table.set_demand(rows, demand, store)
+    
+    def _demand_scores(self, reachable: np.ndarray) -> np.ndarray:
+        if self.max_center_demand <= 0:
+            return np.zeros(len(reachable), dtype=np.float32)
+        # 1 means at least the demand of the largest centre is within easy reach
+        return np.minimum(reachable[:, self._scoring_column] / self.max_center_demand, 1).astype(np.float32)
+    
+    def _on_change(self, event: str, rows: np.ndarray):
+        if event == 'rescore':
+            # Only model scores changed; site locations did not
+            return
+        if event == 'load':
+            with self._lock:
+                if self._attached_store is self.table.store:
+                    # Attached together with the table's sites
+                    return
+                self._reset(len(self.table))
+        self.update(rows)
+    
+    def demand_scores(self, site_ids: List[str]) -> np.ndarray:
+        """Demand criterion of the given sites; 0 for sites not in the table"""
+        rows = self.table.rows_for(site_ids)
+        scores = np.zeros(len(site_ids), dtype=np.float32)
+        known = (rows >= 0) & (rows < len(self.reachable))
+        with self._lock:
+            scores[known] = self._demand_scores(self.reachable[rows[known]])
+        return scores
+    
+    def site_demand(self, row: int) -> Dict[str, Any]:
+        """Reachable demand and nearest centres of one table row"""
+        with self._lock:
+            reachable = self.reachable[row]
+            nearest = [
+                {
+                    'center_id': self.centers[index].id,
+                    'name': self.centers[index].name,
+                    'distance_km': float(distance),
+                    'annual_demand': float(self._center_demand[index])
+                }
+                for index, distance in zip(self.nearest[row], self.nearest_km[row])
+                if index >= 0
+            ]
+            return {
+                'site_id': self.table.site_ids[row],
+                'reachable_demand': {f"{radius:g}": float(value) for radius, value in zip(self.radii_km, reachable)},
+                'demand_score': float(self._demand_scores(reachable[None, :])[0]),
+                'nearest_centers': nearest
+            }
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "centers": len(self.centers),
+            "sites": len(self.reachable),
+            "radii_km": self.radii_km.tolist(),
+            "scoring_radius_km": self.scoring_radius_km,
+            "total_demand": self.total_demand,
+            "version": self.version,
+            "last_compute_seconds": self.compute_seconds
+        }
@@ -0,0 +1,100 @@
+import math
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+from models.data_models import CriteriaWeights
+from services.site_scores import SiteScoreTable
+from services.spatial_index import GeoGridIndex
+
+# Web Mercator cannot represent the poles
+MAX_MERCATOR_LAT = 85.0511287798
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(min_lat, min_lon, max_lat, max_lon) of an XYZ slippy-map tile"""
+    n = 2 ** z
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lon, max_lat, max_lon
+
+def _tile_pixels(z: int, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Fractional global tile coordinates of points at zoom z"""
+    n = 2 ** z
+    lat_rad = np.radians(np.clip(lats, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    tx = (lons + 180.0) / 360.0 * n
+    ty = (1.0 - np.arcsinh(np.tan(lat_rad)) / math.pi) / 2.0 * n
+    return tx, ty
+
+class TileBuilder:
+    """Builds per-tile site payloads, clustering sites server-side at low zoom"""
+    
+    def __init__(self, site_scores: SiteScoreTable, site_index: GeoGridIndex,
+                 cluster_max_zoom: int = 8, cluster_grid: int = 8):
+        self.site_scores = site_scores
+        self.site_index = site_index
+        self.cluster_max_zoom = cluster_max_zoom
+        self.cluster_grid = cluster_grid
+        self.weights = CriteriaWeights()
+    
+    def build(self, z: int, x: int, y: int) -> Dict[str, Any]:
+        """Sites (or clusters at low zoom) inside tile z/x/y"""
+        rows = self.site_index.bbox(*tile_bounds(z, x, y))
+        # Points exactly on a shared edge belong to the tile on their east/south side only
+        coordinates = self.site_scores.coordinates[rows]
+        tx, ty = _tile_pixels(z, coordinates[:, 0], coordinates[:, 1])
+        own = (np.floor(tx) == x) & (np.floor(ty) == y)
+        rows, coordinates, tx, ty = rows[own], coordinates[own], tx[own], ty[own]
+        scores = self.site_scores.score_rows(rows, self.weights)
+        
+        payload = {"z": z, "x": x, "y": y, "count": int(len(rows))}
+        if z > self.cluster_max_zoom:
+            payload["clustered"] = False
+            payload["sites"] = [
+                {
+                    "site_id": self.site_scores.site_ids[row],
+                    "site_name": self.site_scores.names[row],
+                    "coordinates": coordinates[i].tolist(),
+                    "suitability_score": round(float(scores[i]), 2)
+                }
+                for i, row in enumerate(rows)
+            ]
+            return payload
+        
+        payload["clustered"] = True
+        payload["clusters"] = self._cluster(coordinates, scores, tx - x, ty - y)
+        return payload
+    
+    def _cluster(self, coordinates: np.ndarray, scores: np.ndarray, fx: np.ndarray, fy: np.ndarray):
+        """Aggregate sites into a cluster_grid x cluster_grid grid over the tile"""
+        if len(scores) == 0:
+            return []
+        
+        grid = self.cluster_grid
+        cell = (
+            np.clip((fy * grid).astype(np.int64), 0, grid - 1) * grid +
+            np.clip((fx * grid).astype(np.int64), 0, grid - 1)
+        )
+        cells, inverse = np.unique(cell, return_inverse=True)
+        n_cells = len(cells)
+        
+        counts = np.bincount(inverse, minlength=n_cells)
+        score_sums = np.bincount(inverse, weights=scores, minlength=n_cells)
+        lat_sums = np.bincount(inverse, weights=coordinates[:, 0], minlength=n_cells)
+        lon_sums = np.bincount(inverse, weights=coordinates[:, 1], minlength=n_cells)
+        
+        mins = np.full((n_cells, 2), np.inf)
+        maxs = np.full((n_cells, 2), -np.inf)
+        np.minimum.at(mins, inverse, coordinates)
+        np.maximum.at(maxs, inverse, coordinates)
+        
+        return [
+            {
+                "count": int(counts[i]),
+                "mean_suitability": round(float(score_sums[i] / counts[i]), 2),
+                "centroid": [float(lat_sums[i] / counts[i]), float(lon_sums[i] / counts[i])],
+                "bbox": [float(mins[i, 0]), float(mins[i, 1]), float(maxs[i, 0]), float(maxs[i, 1])]
+            }
+            for i in range(n_cells)
+        ]
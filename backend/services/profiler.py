@@ -0,0 +1,92 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Innermost frames of threads that are parked waiting for work
+IDLE_FRAMES = {"threading.py:wait", "queue.py:get", "selectors.py:select", "thread.py:_worker"}
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler that can be switched on and off inside a running process"""
+    
+    def __init__(self, interval_s: float = 0.005, max_depth: int = 64):
+        self.interval_s = interval_s
+        self.max_depth = max_depth
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self, duration_s: Optional[float] = None, interval_s: Optional[float] = None) -> bool:
+        """Begin sampling every thread's stack; returns False if already running"""
+        with self._lock:
+            if self.running:
+                return False
+            if interval_s:
+                self.interval_s = interval_s
+            self.samples = Counter()
+            self.sample_count = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(duration_s,), name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+        logger.info(f"Sampling profiler started (interval {self.interval_s * 1000:.1f} ms)")
+        return True
+    
+    def stop(self) -> bool:
+        """Stop sampling, keeping the collected stacks; returns False if it was not running"""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return False
+            self._stop.set()
+            self._thread = None
+        thread.join()
+        logger.info(f"Sampling profiler stopped after {self.sample_count} samples")
+        return True
+    
+    def _run(self, duration_s: Optional[float]):
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + duration_s if duration_s else None
+        while not self._stop.wait(self.interval_s):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                # Idle pool workers would otherwise dominate the output
+                if stack and stack[0] in IDLE_FRAMES:
+                    continue
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+    
+    def collapsed(self, limit: Optional[int] = None) -> str:
+        """Samples in collapsed-stack format, ready for flamegraph.pl or speedscope"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common(limit)) + "\n"
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "interval_ms": self.interval_s * 1000,
+            "samples": self.sample_count,
+            "distinct_stacks": len(self.samples),
+            "started_at": self.started_at
+        }
@@ -0,0 +1,168 @@
+import base64
+import bisect
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.data_models import CriteriaWeights
+from services.site_scores import SiteScoreTable
+from services.site_store import POLICY_ZONES
+
+logger = logging.getLogger(__name__)
+
+class SortedScoreList:
+    """(score, row) entries kept in ascending order for bisection range queries"""
+    
+    def __init__(self, entries: Optional[List[Tuple[float, int]]] = None):
+        self.entries: List[Tuple[float, int]] = entries or []
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def insert(self, score: float, row: int):
+        bisect.insort(self.entries, (score, row))
+    
+    def remove(self, score: float, row: int):
+        index = bisect.bisect_left(self.entries, (score, row))
+        if index < len(self.entries) and self.entries[index] == (score, row):
+            del self.entries[index]
+    
+    def bounds(self, min_score: Optional[float], max_score: Optional[float],
+               before: Optional[Tuple[float, int]] = None) -> Tuple[int, int]:
+        """Half-open slice of entries with min_score <= score <= max_score, strictly below `before`"""
+        low = 0 if min_score is None else bisect.bisect_left(self.entries, (min_score, -1))
+        high = len(self.entries) if max_score is None else bisect.bisect_right(self.entries, (max_score, float('inf')))
+        if before is not None:
+            high = min(high, bisect.bisect_left(self.entries, before))
+        return low, max(low, high)
+
+def encode_cursor(score: float, row: int) -> str:
+    return base64.urlsafe_b64encode(f"{score!r}:{row}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        score, row = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return float(score), int(row)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+class RecommendationIndex:
+    """Hash indexes on state and policy zone over score-sorted lists, maintained from table changes"""
+    
+    def __init__(self, table: SiteScoreTable, weights: Optional[CriteriaWeights] = None,
+                 rebuild_fraction: float = 0.05):
+        self.table = table
+        # Sites without a stored score are ranked by their model score under these weights
+        self.weights = weights or CriteriaWeights()
+        # Batches touching more than this fraction of sites rebuild instead of inserting one by one
+        self.rebuild_fraction = rebuild_fraction
+        self._lock = threading.Lock()
+        self._clear()
+        table.add_change_listener(self._on_change)
+    
+    def _clear(self):
+        self.by_score = SortedScoreList()
+        self.by_state: Dict[str, SortedScoreList] = {}
+        self.by_policy_zone: Dict[str, SortedScoreList] = {}
+        # Currently indexed (score, state, policy zone) per row
+        self._entries: Dict[int, Tuple[float, str, str]] = {}
+    
+    def _row_keys(self, rows: np.ndarray) -> Tuple[List[float], List[str], List[str]]:
+        store = self.table.store
+        scores = self.table.effective_scores(rows, self.weights).tolist()
+        states = [store.state_categories[code] for code in store.columns['state_code'][rows]]
+        zones = [POLICY_ZONES[code].value for code in store.columns['policy_zone_code'][rows]]
+        return scores, states, zones
+    
+    def rebuild(self):
+        """Index every site from scratch with one sort per list"""
+        with self._lock:
+            rows = np.arange(len(self.table))
+            scores, states, zones = self._row_keys(rows)
+            self._clear()
+            
+            entries = sorted(zip(scores, rows.tolist()))
+            self.by_score = SortedScoreList(entries)
+            for score, row in entries:
+                self._entries[row] = (score, states[row], zones[row])
+                self.by_state.setdefault(states[row], SortedScoreList()).entries.append((score, row))
+                self.by_policy_zone.setdefault(zones[row], SortedScoreList()).entries.append((score, row))
+        logger.info(f"Recommendation index built over {len(rows)} sites")
+    
+    def update(self, rows: np.ndarray):
+        """Re-index the given rows after their score, state or policy zone changed"""
+        rows = np.asarray(rows, dtype=np.intp)
+        if len(rows) > max(1000, self.rebuild_fraction * len(self.table)):
+            self.rebuild()
+            return
+        
+        with self._lock:
+            scores, states, zones = self._row_keys(rows)
+            for row, score, state, zone in zip(rows.tolist(), scores, states, zones):
+                previous = self._entries.get(row)
+                if previous == (score, state, zone):
+                    continue
+                if previous is not None:
+                    old_score, old_state, old_zone = previous
+                    self.by_score.remove(old_score, row)
+                    self.by_state[old_state].remove(old_score, row)
+                    self.by_policy_zone[old_zone].remove(old_score, row)
+                
+                self.by_score.insert(score, row)
+                self.by_state.setdefault(state, SortedScoreList()).insert(score, row)
+                self.by_policy_zone.setdefault(zone, SortedScoreList()).insert(score, row)
+                self._entries[row] = (score, state, zone)
+    
+    def _on_change(self, event: str, rows: np.ndarray):
+        if event == 'upsert':
+            self.update(rows)
+        else:
+            # A fresh load or a model swap moves most scores at once
+            self.rebuild()
+    
+    def query(self, state: Optional[str] = None, policy_zone: Optional[str] = None,
+              min_score: Optional[float] = None, max_score: Optional[float] = None,
+              limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Tuple[int, float]], Optional[int], Optional[str]]:
+        """Best-first (row, score) page, the total match count when known without a scan, and the next cursor"""
+        before = decode_cursor(cursor) if cursor else None
+        with self._lock:
+            if (state is not None and state not in self.by_state) or \
+                    (policy_zone is not None and policy_zone not in self.by_policy_zone):
+                return [], 0, None
+            
+            candidates = [self.by_score]
+            if state is not None:
+                candidates.append(self.by_state[state])
+            if policy_zone is not None:
+                candidates.append(self.by_policy_zone[policy_zone])
+            
+            # Walk the narrowest index; any other filter is checked per entry
+            ranges = [(index, *index.bounds(min_score, max_score, before)) for index in candidates[1:] or candidates]
+            index, low, high = min(ranges, key=lambda r: r[2] - r[1])
+            check_state = state if index is not self.by_state.get(state) else None
+            check_zone = policy_zone if index is not self.by_policy_zone.get(policy_zone) else None
+            
+            page = []
+            position = high
+            while position > low and len(page) < limit:
+                position -= 1
+                score, row = index.entries[position]
+                _, row_state, row_zone = self._entries[row]
+                if check_state is not None and row_state != check_state:
+                    continue
+                if check_zone is not None and row_zone != check_zone:
+                    continue
+                page.append((row, score))
+            
+            exhausted = position <= low
+            total = None
+            if before is None and check_state is None and check_zone is None:
+                total = high - low
+        
+        next_cursor = None
+        if page and not exhausted:
+            last_row, last_score = page[-1]
+            next_cursor = encode_cursor(last_score, last_row)
+        return page, total, next_cursor
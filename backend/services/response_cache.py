@@ -0,0 +1,167 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from services.score_cache import ScoreCache
+from services.serialization import dump_models, dumps
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header value matches etag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+def serialize(payload: Any) -> bytes:
+    """JSON bytes for a Pydantic model, a list of them, or plain data"""
+    if isinstance(payload, BaseModel):
+        return payload.model_dump_json().encode("utf-8")
+    if isinstance(payload, list) and payload and all(type(item) is type(payload[0]) for item in payload) \
+            and isinstance(payload[0], BaseModel):
+        return dump_models(type(payload[0]), payload)
+    return dumps(jsonable_encoder(payload))
+
+class CachedBody:
+    """Serialized response body with its ETag and pre-compressed variants"""
+    
+    __slots__ = ("body", "etag", "encoded", "build_seconds")
+    
+    def __init__(self, body: bytes, encoded: Dict[str, bytes], build_seconds: float):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.encoded = encoded
+        self.build_seconds = build_seconds
+
+class ResponseCache:
+    """Serialized, optionally pre-compressed read responses keyed by route, query and data version"""
+    
+    def __init__(self, max_entries: int = 1024, max_body_bytes: int = 64 * 1024 * 1024,
+                 compress_min_bytes: int = 1024, max_age_seconds: int = 0):
+        self._entries = ScoreCache(max_size=max_entries, ttl_seconds=0)
+        self.max_body_bytes = max_body_bytes
+        self.compress_min_bytes = compress_min_bytes
+        self.max_age_seconds = max_age_seconds
+        self.encodings = ["br", "gzip"] if brotli is not None else ["gzip"]
+        self._lock = threading.Lock()
+        # Builds in flight, so concurrent misses for one key wait on a single build
+        self._pending: Dict[Tuple, asyncio.Future] = {}
+        self.not_modified = 0
+        self.build_seconds_saved = 0.0
+        self.bytes_sent = 0
+        self.bytes_saved = 0
+    
+    @staticmethod
+    def make_key(request: Request, version: Hashable) -> Tuple:
+        return (request.url.path, tuple(sorted(request.query_params.multi_items())), version)
+    
+    def _compress(self, body: bytes) -> Dict[str, bytes]:
+        encoded = {}
+        if len(body) < self.compress_min_bytes:
+            return encoded
+        encoded["gzip"] = gzip.compress(body, compresslevel=6)
+        if brotli is not None:
+            encoded["br"] = brotli.compress(body, quality=5)
+        return encoded
+    
+    def _build(self, build: Callable[[], Any]) -> CachedBody:
+        start = time.perf_counter()
+        body = serialize(build())
+        encoded = self._compress(body)
+        return CachedBody(body, encoded, time.perf_counter() - start)
+    
+    def _negotiate(self, entry: CachedBody, accept_encoding: str) -> Tuple[Optional[str], bytes]:
+        accepted = {part.split(";")[0].strip().lower() for part in accept_encoding.split(",")}
+        for encoding in self.encodings:
+            if encoding in accepted and encoding in entry.encoded:
+                return encoding, entry.encoded[encoding]
+        return None, entry.body
+    
+    async def _build_entry(self, key: Tuple, build: Callable[[], Any],
+                           run: Optional[Callable[..., Awaitable[Any]]]) -> CachedBody:
+        """Build and cache a missing entry once, off the event loop if run (e.g. ScoringPool.run) is given"""
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        if run is None:
+            entry = self._build(build)
+        else:
+            pending = self._pending[key] = asyncio.ensure_future(run(self._build, build))
+            try:
+                entry = await asyncio.shield(pending)
+            finally:
+                self._pending.pop(key, None)
+        if len(entry.body) <= self.max_body_bytes:
+            self._entries.put(key, entry)
+        return entry
+    
+    async def respond(self, request: Request, version: Hashable, build: Callable[[], Any],
+                      run: Optional[Callable[..., Awaitable[Any]]] = None) -> Response:
+        """Serve the cached response for this request, building and caching it on a miss"""
+        key = self.make_key(request, version)
+        entry = self._entries.get(key)
+        hit = entry is not None
+        if not hit:
+            entry = await self._build_entry(key, build, run)
+        
+        encoding, content = self._negotiate(entry, request.headers.get("accept-encoding", ""))
+        # Each encoding is a different representation, so it gets its own strong validator
+        etag = entry.etag if encoding is None else f'{entry.etag[:-1]}-{encoding}"'
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={self.max_age_seconds}",
+            "Vary": "Accept-Encoding"
+        }
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self._record(hit, entry, sent=0, not_modified=True)
+            return Response(status_code=304, headers=headers)
+        
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        self._record(hit, entry, sent=len(content))
+        return Response(content=content, media_type="application/json", headers=headers)
+    
+    def _record(self, hit: bool, entry: CachedBody, sent: int, not_modified: bool = False):
+        with self._lock:
+            if hit:
+                self.build_seconds_saved += entry.build_seconds
+            if not_modified:
+                self.not_modified += 1
+            self.bytes_sent += sent
+            self.bytes_saved += len(entry.body) - sent
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit rates plus the serialization time and bytes the cache has saved"""
+        entries = self._entries.stats()
+        with self._lock:
+            return {
+                "size": entries["size"],
+                "hits": entries["hits"],
+                "misses": entries["misses"],
+                "evictions": entries["evictions"],
+                "hit_rate": entries["hit_rate"],
+                "not_modified": self.not_modified,
+                "build_seconds_saved": self.build_seconds_saved,
+                "bytes_sent": self.bytes_sent,
+                "bytes_saved": self.bytes_saved,
+                "encodings": self.encodings
+            }
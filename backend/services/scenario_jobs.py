@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows, where jobs are never shared between worker processes
+    fcntl = None
+
+from models.data_models import CriteriaWeights
+from services.site_scores import SiteScoreTable
+
+logger = logging.getLogger(__name__)
+
+CHUNK_FILE = re.compile(r'chunk_(\d+)\.npy')
+
+def _write_json_atomic(path: str, payload: Dict[str, Any]):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(payload, f)
+    os.replace(path + '.tmp', path)
+
+class ScenarioJobManager:
+    """Local job queue that scores the site catalogue under many weight scenarios in checkpointed chunks"""
+    
+    def __init__(self, site_scores: SiteScoreTable, jobs_dir: str = "data/jobs", chunk_size: int = 10000,
+                 max_workers: int = 2):
+        self.site_scores = site_scores
+        self.jobs_dir = jobs_dir
+        self.chunk_size = chunk_size
+        # Jobs get their own small executor so they never queue ahead of interactive requests
+        # on the scoring pool; at most max_workers chunks run at a time
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scenario-job")
+        self._tasks: Dict[str, asyncio.Task] = {}
+    
+    @staticmethod
+    def _valid_job_id(job_id: str) -> bool:
+        return re.fullmatch(r'[0-9a-f]{32}', job_id) is not None
+    
+    def _job_dir(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, job_id)
+    
+    def _chunk_path(self, job_id: str, chunk_index: int) -> str:
+        return os.path.join(self._job_dir(job_id), f"chunk_{chunk_index:06d}.npy")
+    
+    def _site_ids_path(self, job_id: str) -> str:
+        return os.path.join(self._job_dir(job_id), 'site_ids.npy')
+    
+    def _load_site_ids(self, job_id: str) -> np.ndarray:
+        return np.load(self._site_ids_path(job_id), mmap_mode='r')
+    
+    def _acquire(self, job_id: str) -> Optional[Any]:
+        """Take the job's lock file, or None if another worker holds it; the lock dies with its holder"""
+        lock = open(os.path.join(self._job_dir(job_id), 'lock'), 'w')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return None
+        return lock
+    
+    def _load_spec(self, job_id: str) -> Dict[str, Any]:
+        with open(os.path.join(self._job_dir(job_id), 'job.json')) as f:
+            return json.load(f)
+    
+    def _save_spec(self, spec: Dict[str, Any]):
+        spec['updated_at'] = datetime.now().isoformat()
+        _write_json_atomic(os.path.join(self._job_dir(spec['job_id']), 'job.json'), spec)
+    
+    def _snapshot_site_ids(self, job_id: str) -> int:
+        """Save the current catalogue's site ids for a job; returns how many there are"""
+        site_ids = np.array(self.site_scores.site_ids, dtype=str)
+        np.save(self._site_ids_path(job_id), site_ids)
+        return len(site_ids)
+    
+    async def submit(self, scenarios: Dict[str, CriteriaWeights], top_k: int = 50) -> str:
+        """Persist a scenario job over the current site catalogue and start it"""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._job_dir(job_id))
+        
+        # Snapshot the catalogue so a resumed job scores the same sites; job.json only holds status and counters.
+        # Copying and saving every site id runs on the job executor, off the event loop
+        n_sites = await asyncio.get_running_loop().run_in_executor(self._executor, self._snapshot_site_ids, job_id)
+        spec = {
+            'job_id': job_id,
+            'status': 'queued',
+            'scenarios': {name: weights.model_dump() for name, weights in scenarios.items()},
+            'top_k': top_k,
+            'total_sites': n_sites,
+            'chunk_size': self.chunk_size,
+            'total_chunks': max(1, -(-n_sites // self.chunk_size)),
+            'created_at': datetime.now().isoformat(),
+            'error': None
+        }
+        self._save_spec(spec)
+        self._start(job_id)
+        logger.info(f"Submitted scenario job {job_id}: {len(scenarios)} scenarios x {n_sites} sites")
+        return job_id
+    
+    def _start(self, job_id: str) -> bool:
+        """Run the job in this process unless another worker already owns it"""
+        lock = self._acquire(job_id)
+        if lock is None:
+            return False
+        # Re-read under the lock: the previous owner may have finished the job since it was listed
+        try:
+            spec = self._load_spec(job_id)
+        except (OSError, ValueError):
+            spec = None
+        if spec is None or spec['status'] not in ('queued', 'running'):
+            lock.close()
+            return False
+        self._tasks[job_id] = asyncio.get_running_loop().create_task(self._run(spec, lock))
+        return True
+    
+    async def resume_incomplete(self):
+        """Restart jobs interrupted by a crash or restart; finished chunks are not recomputed"""
+        if not os.path.isdir(self.jobs_dir):
+            return
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            if not self._valid_job_id(job_id):
+                continue
+            try:
+                spec = self._load_spec(job_id)
+            except (OSError, ValueError):
+                continue
+            # With several workers sharing jobs_dir, only the one that wins the job's lock resumes it
+            if spec['status'] in ('queued', 'running') and job_id not in self._tasks and self._start(job_id):
+                logger.info(f"Resuming scenario job {job_id}")
+    
+    def _completed_chunks(self, job_id: str) -> Set[int]:
+        """Indices of checkpointed chunks, from a single directory listing"""
+        return {
+            int(match.group(1))
+            for match in map(CHUNK_FILE.fullmatch, os.listdir(self._job_dir(job_id)))
+            if match is not None
+        }
+    
+    def _score_chunk(self, spec: Dict[str, Any], all_site_ids: np.ndarray, weights_list: List[CriteriaWeights],
+                     chunk_index: int):
+        """Score one chunk of sites under every scenario and checkpoint it to disk"""
+        start = chunk_index * spec['chunk_size']
+        site_ids = all_site_ids[start:start + spec['chunk_size']].tolist()
+        rows = self.site_scores.rows_for(site_ids)
+        found = rows >= 0
+        
+        # Sites removed since submission score as NaN
+        scores = np.full((len(site_ids), len(weights_list)), np.nan, dtype=np.float32)
+        if found.any():
+            scores[found] = self.site_scores.score_rows_many(rows[found], weights_list)
+        
+        path = self._chunk_path(spec['job_id'], chunk_index)
+        with open(path + '.tmp', 'wb') as f:
+            np.save(f, scores)
+        os.replace(path + '.tmp', path)
+    
+    async def _run(self, spec: Dict[str, Any], lock):
+        job_id = spec['job_id']
+        try:
+            if 'site_ids' in spec:
+                # Submitted before site ids moved out of job.json
+                np.save(self._site_ids_path(job_id), np.array(spec['site_ids'], dtype=str))
+                spec['total_sites'] = len(spec.pop('site_ids'))
+            spec['status'] = 'running'
+            self._save_spec(spec)
+            
+            weights_list = [CriteriaWeights(**weights) for weights in spec['scenarios'].values()]
+            site_ids = self._load_site_ids(job_id)
+            done = self._completed_chunks(job_id)
+            pending = [i for i in range(spec['total_chunks']) if i not in done]
+            loop = asyncio.get_running_loop()
+            # A window of chunks at a time, so a large job never floods the executor's queue
+            for start in range(0, len(pending), self.max_workers):
+                await asyncio.gather(*[
+                    loop.run_in_executor(self._executor, self._score_chunk, spec, site_ids, weights_list, chunk_index)
+                    for chunk_index in pending[start:start + self.max_workers]
+                ])
+            
+            results = await loop.run_in_executor(self._executor, self._summarize, spec, site_ids)
+            _write_json_atomic(os.path.join(self._job_dir(job_id), 'results.json'), results)
+            spec['status'] = 'completed'
+        except Exception as e:
+            logger.error(f"Scenario job {job_id} failed: {str(e)}")
+            spec['status'] = 'failed'
+            spec['error'] = str(e)
+        finally:
+            self._save_spec(spec)
+            self._tasks.pop(job_id, None)
+            lock.close()
+    
+    def _summarize(self, spec: Dict[str, Any], site_ids: np.ndarray) -> Dict[str, Any]:
+        """Per-scenario statistics and top-k sites from the checkpointed chunks"""
+        scores = np.concatenate([
+            np.load(self._chunk_path(spec['job_id'], i)) for i in range(spec['total_chunks'])
+        ])
+        rows = self.site_scores.rows_for(site_ids.tolist())
+        
+        scenarios = []
+        for column, name in enumerate(spec['scenarios']):
+            scored = ~np.isnan(scores[:, column])
+            column_scores = np.where(scored, scores[:, column], -np.inf)
+            k = min(spec['top_k'], len(column_scores))
+            best = np.argpartition(-column_scores, k - 1)[:k] if k else np.empty(0, dtype=np.intp)
+            best = best[np.argsort(-column_scores[best], kind='stable')]
+            scenarios.append({
+                'scenario': name,
+                # None rather than NaN when every site was removed, which JSON cannot encode
+                'mean_score': float(scores[scored, column].mean()) if scored.any() else None,
+                'top_sites': [
+                    {
+                        'rank': rank,
+                        'suitability_score': float(scores[i, column]),
+                        **self.site_scores.describe(rows[i])
+                    }
+                    for rank, i in enumerate(best, start=1)
+                    if np.isfinite(column_scores[i]) and rows[i] >= 0
+                ]
+            })
+        return {'job_id': spec['job_id'], 'scenarios': scenarios}
+    
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of a job, or None if unknown"""
+        if not self._valid_job_id(job_id):
+            return None
+        try:
+            spec = self._load_spec(job_id)
+        except (OSError, ValueError):
+            return None
+        completed = len(self._completed_chunks(job_id))
+        return {
+            'job_id': job_id,
+            'status': spec['status'],
+            'completed_chunks': completed,
+            'total_chunks': spec['total_chunks'],
+            'progress': completed / spec['total_chunks'],
+            'created_at': spec['created_at'],
+            'updated_at': spec['updated_at'],
+            'error': spec['error']
+        }
+    
+    def results(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Results of a completed job, or None if not available yet"""
+        if not self._valid_job_id(job_id):
+            return None
+        path = os.path.join(self._job_dir(job_id), 'results.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def shutdown(self):
+        """Stop the job executor; interrupted jobs resume from their checkpoints on the next start"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from models.data_models import CriteriaWeights
+
+logger = logging.getLogger(__name__)
+
+class ScoreCache:
+    """Bounded LRU/TTL cache of suitability results keyed on site, weights and model version"""
+    
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        # Keys by their first element (the site id for score keys), so invalidation skips unrelated entries
+        self._keys_by_site: Dict[Any, Set[Tuple]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    @staticmethod
+    def weights_hash(weights: CriteriaWeights) -> str:
+        """Canonical hash of the criteria weight values"""
+        canonical = json.dumps(
+            {name: float(value) for name, value in weights.model_dump().items()},
+            sort_keys=True
+        )
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+    
+    def make_key(self, site_id: str, weights: CriteriaWeights, model_version: Optional[str]) -> Tuple:
+        """Build the cache key for a site scored under the given weights and model"""
+        return (site_id, self.weights_hash(weights), model_version)
+    
+    def _remove(self, key: Tuple):
+        del self._entries[key]
+        keys = self._keys_by_site.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_site[key[0]]
+    
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            stored_at, value = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key: Tuple, value: Any):
+        """Store value under key, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            self._keys_by_site.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def invalidate_site(self, site_id: str):
+        """Drop every cached result for a site whose data changed"""
+        self.invalidate_sites([site_id])
+    
+    def invalidate_sites(self, site_ids: Iterable[str]):
+        """Drop every cached result for several sites; cost is independent of the cache size"""
+        with self._lock:
+            for site_id in site_ids:
+                for key in list(self._keys_by_site.get(site_id, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+    
+    def clear(self):
+        """Drop every cached result, e.g. after the model is retrained"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_site.clear()
+        logger.info("Score cache cleared")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from models.data_models import SiteData, CriteriaWeights
+from models.suitability_model import HydrogenSuitabilityModel
+from services.metrics import FALLBACKS, QUEUE_WAIT, stage
+
+logger = logging.getLogger(__name__)
+
+# Per-process model used by process-pool workers, loaded once by the initializer
+_worker_model: Optional[HydrogenSuitabilityModel] = None
+
+def _init_worker(model_path: str, use_compiled_engine: bool):
+    """Load the model artifact once in each worker process"""
+    global _worker_model
+    _worker_model = HydrogenSuitabilityModel(model_path=model_path, use_compiled_engine=use_compiled_engine)
+    _worker_model.load_model(train_if_missing=False, mmap_mode='r')
+
+def _worker_predict_base_scores(features: np.ndarray, model_version: Optional[str],
+                                artifact_path: Optional[str] = None) -> Optional[np.ndarray]:
+    """Score a feature matrix in a worker process, reloading if the artifact has moved on"""
+    if _worker_model.model_version != model_version:
+        _worker_model.load_model(train_if_missing=False, mmap_mode='r', artifact_path=artifact_path)
+    return _worker_model.predict_base_scores(features)
+
+class ScoringPool:
+    """Runs CPU-bound scoring off the event loop in a bounded thread or process pool"""
+    
+    def __init__(self, model: HydrogenSuitabilityModel, mode: str = "thread",
+                 max_workers: int = 4, max_concurrency: int = 8):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Unknown scoring pool mode: {mode}")
+        
+        self.model = model
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        
+        # Analysis generation needs in-process services, so a thread pool always exists
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring")
+        self._processes: Optional[Executor] = None
+        if mode == "process":
+            self._processes = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model.model_path, model.use_compiled_engine)
+            )
+        
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.max_queue_depth = 0
+    
+    async def _submit(self, executor: Executor, fn: Callable, *args) -> Any:
+        """Run fn in executor once a concurrency slot is free"""
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        try:
+            with QUEUE_WAIT.time("threads" if executor is self._threads else "processes"):
+                await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        
+        self.active += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+        self.completed += 1
+        return result
+    
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run a synchronous CPU-bound callable on the thread pool"""
+        return await self._submit(self._threads, fn, *args)
+    
+    async def score_sites(self, sites: List[SiteData], weights: CriteriaWeights,
+                          demand: Optional[np.ndarray] = None) -> np.ndarray:
+        """Suitability scores for sites, computed off the event loop"""
+        if self._processes is None or self.model.model is None:
+            return await self.run(self.model.predict_suitability_batch, sites, weights, demand)
+        
+        if not sites:
+            return np.empty(0)
+        
+        # Workers only receive the compact feature matrix; weighting stays in this process
+        with stage("feature_extraction"):
+            features = self.model.extract_features_batch(sites)
+        base_scores = await self._submit(
+            self._processes, _worker_predict_base_scores, features, self.model.model_version,
+            self.model.artifact_path
+        )
+        if base_scores is None:
+            # Worker-side counters live in another process, so record the fallback here
+            FALLBACKS.inc("batch", "worker", amount=len(features))
+        return self.model.combine_scores(self.model.component_scores(features), base_scores, weights, demand)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool configuration and queue-depth counters"""
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "active": self.active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "max_queue_depth": self.max_queue_depth
+        }
+    
+    def shutdown(self):
+        """Stop the worker pools"""
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,139 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from models.data_models import CriteriaWeights, WeightSampling
+from services.site_scores import SiteScoreTable
+
+logger = logging.getLogger(__name__)
+
+RANK_PERCENTILES = [5, 25, 50, 75, 95]
+# Score matrix, matmul/clip temporaries, mask and either a sorted copy or the index and
+# value arrays of the sites above the reported ones; per site per sample
+BYTES_PER_SCORE = 32
+
+def sample_weights(center: np.ndarray, n_samples: int, method: WeightSampling = WeightSampling.DIRICHLET,
+                   concentration: float = 100.0, spread: float = 0.2,
+                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """(n_samples, n_criteria) weight vectors scattered around center; zero weights stay zero"""
+    rng = rng or np.random.default_rng()
+    samples = np.zeros((n_samples, len(center)))
+    if method == WeightSampling.UNIFORM:
+        samples[:] = center * rng.uniform(1 - spread, 1 + spread, size=samples.shape)
+        return np.clip(samples, 0, 100)
+    
+    # Dirichlet around the weight proportions, keeping the total weight of the center
+    active = center > 0
+    if active.any():
+        total = center[active].sum()
+        samples[:, active] = rng.dirichlet(concentration * center[active] / total, size=n_samples) * total
+    return samples
+
+def _ranks(sorted_scores: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """1-based rank of each score among ascending sorted_scores: one plus the number strictly above it"""
+    return len(sorted_scores) - np.searchsorted(sorted_scores, scores, side='right') + 1
+
+class SensitivityAnalyzer:
+    """Rank stability of sites under Monte Carlo perturbations of the criteria weights"""
+    
+    def __init__(self, table: SiteScoreTable, memory_bytes: int = 256 * 1024 * 1024):
+        self.table = table
+        # Upper bound on the sites x samples score block held at once
+        self.memory_bytes = memory_bytes
+    
+    def analyze(self, weights: CriteriaWeights, n_samples: int = 500,
+                method: WeightSampling = WeightSampling.DIRICHLET, concentration: float = 100.0,
+                spread: float = 0.2, site_ids: Optional[List[str]] = None, k: int = 10,
+                state: Optional[str] = None, policy_zone: Optional[str] = None,
+                land_type: Optional[str] = None, seed: Optional[int] = None) -> Dict[str, Any]:
+        """Baseline rank, rank percentiles and probability of ranking in the top-k for each reported site"""
+        model = self.table.model
+        rows, components, base_scores, demand = self.table.candidates(state, policy_zone, land_type)
+        n_sites = len(rows)
+        result = {'total_candidates': n_sites, 'samples': n_samples, 'k': k, 'sites': []}
+        if n_sites == 0:
+            return result
+        
+        baseline = model.combine_scores(components, base_scores, weights, demand).astype(np.float32)
+        sorted_baseline = np.sort(baseline)
+        if site_ids:
+            targets = self._target_positions(rows, site_ids)
+        else:
+            targets = np.argsort(-baseline, kind='stable')[:k]
+        
+        # Scores in float32 halve the memory and sort time; rank ties below that precision are immaterial
+        components = components.astype(np.float32, copy=False)
+        base_scores = base_scores.astype(np.float32) if base_scores is not None else None
+        samples = sample_weights(
+            model.weight_vector(weights), n_samples, method, concentration, spread,
+            np.random.default_rng(seed)
+        ).astype(np.float32)
+        # The demand criterion is held at its given weight; only the six resource weights are sampled
+        demand_weights = np.full(n_samples, weights.demand, dtype=np.float32)
+        
+        ranks = np.empty((len(targets), n_samples), dtype=np.int32)
+        score_sums = np.zeros(len(targets))
+        chunk = max(1, min(n_samples, self.memory_bytes // (BYTES_PER_SCORE * n_sites)))
+        for start in range(0, n_samples, chunk):
+            # One (n_sites, chunk) matrix product scores every site under every sampled weight vector
+            scores = model.combine_weight_matrix(
+                components, base_scores, samples[start:start + chunk].T, demand, demand_weights[start:start + chunk]
+            )
+            target_scores = scores[targets]
+            score_sums += target_scores.sum(axis=1, dtype=np.float64)
+            
+            # Only sites scoring at least the lowest reported site can outrank one, so only those are sorted
+            above = scores >= target_scores.min(axis=0)
+            if np.count_nonzero(above) > above.size // 4:
+                # Most sites qualify: sorting each sample's scores outright is cheaper than gathering them
+                del above
+                by_sample = np.ascontiguousarray(scores.T)
+                del scores
+                by_sample.sort(axis=1)
+                for j, sorted_scores in enumerate(by_sample):
+                    ranks[:, start + j] = _ranks(sorted_scores, target_scores[:, j])
+                continue
+            
+            # nonzero over the transposed mask groups the qualifying sites by sample
+            sample_hits, site_hits = np.nonzero(above.T)
+            hit_scores = scores[site_hits, sample_hits]
+            del scores, above, site_hits
+            bounds = np.concatenate([[0], np.cumsum(np.bincount(sample_hits, minlength=target_scores.shape[1]))])
+            for j in range(target_scores.shape[1]):
+                ranks[:, start + j] = _ranks(np.sort(hit_scores[bounds[j]:bounds[j + 1]]), target_scores[:, j])
+        
+        percentiles = np.percentile(ranks, RANK_PERCENTILES, axis=1)
+        top_k = (ranks <= k).mean(axis=1)
+        baseline_ranks = _ranks(sorted_baseline, baseline[targets])
+        logger.info(f"Sensitivity analysis: {n_samples} weight samples x {n_sites} sites in chunks of {chunk}")
+        
+        result['sites'] = [
+            {
+                **self.table.describe(rows[position]),
+                'baseline_rank': int(baseline_ranks[i]),
+                'baseline_score': float(baseline[position]),
+                'mean_score': float(score_sums[i] / n_samples),
+                'rank_percentiles': {f"p{q}": float(percentiles[p, i]) for p, q in enumerate(RANK_PERCENTILES)},
+                'probability_top_k': float(top_k[i])
+            }
+            for i, position in enumerate(targets)
+        ]
+        result['sites'].sort(key=lambda site: site['baseline_rank'])
+        return result
+    
+    def _target_positions(self, rows: np.ndarray, site_ids: List[str]) -> np.ndarray:
+        """Positions of the given sites among the ascending candidate rows"""
+        target_rows = self.table.rows_for(site_ids)
+        unknown = [site_id for site_id, row in zip(site_ids, target_rows) if row < 0]
+        if unknown:
+            raise ValueError(f"Unknown site ids: {unknown}")
+        
+        positions = np.searchsorted(rows, target_rows)
+        outside = [
+            site_id for site_id, row, position in zip(site_ids, target_rows, positions)
+            if position >= len(rows) or rows[position] != row
+        ]
+        if outside:
+            raise ValueError(f"Sites do not match the filters: {outside}")
+        return positions
@@ -0,0 +1,61 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # Optional; the standard library encoder is the fallback
+    orjson = None
+
+# Named projections clients can pass as `fields` instead of listing every field
+FIELD_PRESETS = {
+    "score": "site_id,suitability_score",
+}
+
+def dumps(data: Any) -> bytes:
+    """Compact JSON bytes for plain data (dicts, lists, strings, numbers)"""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+def parse_fields(model: Type[BaseModel], fields: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Pydantic `include` spec for a projection such as "site_id,analysis.category" or a preset name"""
+    if not fields:
+        return None
+    fields = FIELD_PRESETS.get(fields, fields)
+    
+    include: Dict[str, Any] = {}
+    for path in fields.split(","):
+        path = path.strip()
+        if not path:
+            continue
+        node, current = include, model
+        names = path.split(".")
+        for depth, name in enumerate(names):
+            field = current.model_fields.get(name) if current is not None else None
+            if field is None:
+                raise ValueError(f"Unknown field: {path}")
+            if depth == len(names) - 1:
+                node[name] = True
+                break
+            if node.get(name) is True:
+                # The whole field is already included
+                break
+            node = node.setdefault(name, {})
+            annotation = field.annotation
+            current = annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+    return include or None
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+def dump_models(model: Type[BaseModel], items: Sequence[BaseModel], include: Optional[Dict[str, Any]] = None) -> bytes:
+    """JSON array of models in a single pass of Pydantic's Rust serializer, without re-validating them"""
+    return _list_adapter(model).dump_json(list(items), include={"__all__": include} if include else None)
+
+def dump_ndjson(items: Sequence[BaseModel], include: Optional[Dict[str, Any]] = None) -> bytes:
+    """Newline-delimited JSON, one model per line"""
+    return b"".join(item.model_dump_json(include=include).encode("utf-8") + b"\n" for item in items)
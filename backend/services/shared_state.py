@@ -0,0 +1,385 @@
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows, which runs a single worker
+    fcntl = None
+
+from models.data_models import DemandCenter
+from models.suitability_model import HydrogenSuitabilityModel, train_model_artifact
+from services.demand_surface import DemandSurface
+from services.site_scores import SiteScoreTable
+from services.site_store import COLUMN_SPECS, PackedColumn, SiteStore
+
+logger = logging.getLogger(__name__)
+
+SHARED_STATE_FORMAT_VERSION = 1
+POINTER_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+MODEL_FILE = 'model.pkl'
+GENERATION_PREFIX = 'gen-'
+# Held by the process training a new generation, so workers never train concurrently
+TRAINING_LOCK_FILE = 'TRAINING.lock'
+# Files a model swap rewrites; every other file of a generation is carried over unchanged
+MODEL_DEPENDENT_FILES = (MANIFEST_FILE, MODEL_FILE, 'base_scores.npy')
+
+def read_pointer(root: str) -> Optional[str]:
+    """Name of the current generation, or None before the first publish"""
+    try:
+        with open(os.path.join(root, POINTER_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def read_manifest(root: str, generation: str) -> Dict[str, Any]:
+    with open(os.path.join(root, generation, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('format_version') != SHARED_STATE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported shared state format in {os.path.join(root, generation)}")
+    return manifest
+
+def _generations(root: str) -> List[str]:
+    """Generation directories in publish order"""
+    return sorted(
+        name for name in os.listdir(root)
+        if name.startswith(GENERATION_PREFIX) and name[len(GENERATION_PREFIX):].isdigit()
+    )
+
+def _new_generation(root: str) -> str:
+    """Create the directory of the next generation; concurrent publishers each get their own"""
+    os.makedirs(root, exist_ok=True)
+    generations = _generations(root)
+    number = int(generations[-1][len(GENERATION_PREFIX):]) + 1 if generations else 1
+    while True:
+        generation = f"{GENERATION_PREFIX}{number:06d}"
+        try:
+            os.mkdir(os.path.join(root, generation))
+            return generation
+        except FileExistsError:
+            number += 1
+
+def _commit(root: str, generation: str, manifest: Dict[str, Any], keep_generations: int):
+    """Write the manifest, point CURRENT at the generation and remove all but the newest generations"""
+    with open(os.path.join(root, generation, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+    
+    # The pointer moves last and atomically, so workers only ever see complete generations
+    fd, tmp_path = tempfile.mkstemp(dir=root, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(generation)
+        os.replace(tmp_path, os.path.join(root, POINTER_FILE))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    logger.info(f"Published shared state generation {generation} (model {manifest['model_version']})")
+    
+    # Workers still mapping files of a removed generation keep reading them until they unmap
+    for old in _generations(root)[:-keep_generations]:
+        if old != generation:
+            shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+
+def _link(source: str, target: str):
+    """Hard-link an immutable file into another generation, copying where links are unsupported"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+def _save(directory: str, name: str, values: np.ndarray):
+    np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(values))
+
+def _save_packed(directory: str, name: str, values):
+    packed = values if isinstance(values, PackedColumn) else PackedColumn.pack(values)
+    _save(directory, f"{name}.data", packed.data)
+    _save(directory, f"{name}.offsets", packed.offsets)
+
+def _load(directory: str, name: str) -> np.ndarray:
+    # Copy-on-write: pages stay shared with every other worker until this process writes to them
+    return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode='c')
+
+def _load_packed(directory: str, name: str) -> PackedColumn:
+    return PackedColumn(
+        np.load(os.path.join(directory, f"{name}.data.npy"), mmap_mode='r'),
+        np.load(os.path.join(directory, f"{name}.offsets.npy"), mmap_mode='r')
+    )
+
+def _try_training_lock(root: str):
+    """Open and lock the training lock file, or None if another process holds it"""
+    lock = open(os.path.join(root, TRAINING_LOCK_FILE), 'w')
+    if fcntl is not None:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return None
+    return lock
+
+def training_locked(root: str) -> bool:
+    """Whether some process is training a generation in root"""
+    lock = _try_training_lock(root)
+    if lock is None:
+        return True
+    lock.close()
+    return False
+
+def train_generation(root: str, data_path: Optional[str] = None, keep_generations: int = 3) -> Optional[str]:
+    """Train a model into a new generation and make it current; None if another process is already training"""
+    lock = _try_training_lock(root)
+    if lock is None:
+        logger.info(f"A model is already being trained for {root}")
+        return None
+    with lock:
+        return _train_generation(root, data_path, keep_generations)
+
+def _train_generation(root: str, data_path: Optional[str], keep_generations: int) -> str:
+    current = read_pointer(root)
+    if current is None:
+        raise ValueError(f"No shared state generation published in {root}")
+    manifest = read_manifest(root, current)
+    current_dir = os.path.join(root, current)
+    generation = _new_generation(root)
+    generation_dir = os.path.join(root, generation)
+    
+    artifact_path = train_model_artifact(os.path.join(generation_dir, MODEL_FILE), data_path)
+    model = HydrogenSuitabilityModel(model_path=artifact_path)
+    if not model.load_model(train_if_missing=False, mmap_mode='r'):
+        raise ValueError(f"Training produced no usable model artifact in {generation_dir}")
+    
+    # Sites are unchanged, so only the base scores are recomputed; the rest is shared with the current generation
+    for name in os.listdir(current_dir):
+        if name not in MODEL_DEPENDENT_FILES:
+            _link(os.path.join(current_dir, name), os.path.join(generation_dir, name))
+    features = np.load(os.path.join(current_dir, 'features.npy'), mmap_mode='r')
+    _save(generation_dir, 'base_scores', model.predict_base_scores(features) if len(features) else np.empty(0))
+    
+    manifest.update(
+        generation=generation,
+        created_at=datetime.now().isoformat(),
+        model_version=model.model_version,
+        model_artifact=MODEL_FILE
+    )
+    _commit(root, generation, manifest, keep_generations)
+    return generation
+
+class SharedState:
+    """Model artifact and site arrays published once to disk and memory-mapped by every worker process.
+    
+    Each generation is an immutable directory and the CURRENT pointer file names the live one.
+    Publishing swaps the pointer atomically; workers poll it and attach new generations.
+    """
+    
+    def __init__(self, root: str, table: SiteScoreTable, demand_surface: Optional[DemandSurface] = None,
+                 keep_generations: int = 3, poll_interval_s: float = 2.0):
+        self.root = root
+        self.table = table
+        self.demand_surface = demand_surface
+        # Keep the previous generation so a worker mid-attach never loses its files
+        self.keep_generations = max(2, keep_generations)
+        self.poll_interval_s = poll_interval_s
+        self.generation: Optional[str] = None
+        # Generation whose site arrays are attached; model-only generations carry it over
+        self.sites_generation: Optional[str] = None
+        self.attach_seconds = 0.0
+        self._attached_table_version: Optional[int] = None
+        self._attach_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._training_future: Optional[Future] = None
+    
+    def publish(self) -> str:
+        """Write the table, its demand surface and the active model artifact as the new current generation"""
+        table, model = self.table, self.table.model
+        generation = _new_generation(self.root)
+        generation_dir = os.path.join(self.root, generation)
+        store = table.store
+        
+        for name, values in store.columns.items():
+            if values.dtype == object:
+                _save_packed(generation_dir, name, values)
+            else:
+                _save(generation_dir, name, values)
+        _save_packed(generation_dir, 'site_ids', store.site_ids)
+        _save(generation_dir, 'components', table.components)
+        _save(generation_dir, 'demand', table.demand)
+        if table.base_scores is not None:
+            _save(generation_dir, 'base_scores', table.base_scores)
+        
+        manifest = {
+            'format_version': SHARED_STATE_FORMAT_VERSION,
+            'generation': generation,
+            'sites_generation': generation,
+            'created_at': datetime.now().isoformat(),
+            'sites': len(store),
+            'state_categories': store.state_categories,
+            'model_version': table.model_version,
+            'model_artifact': None,
+            'demand_surface': None
+        }
+        if model.artifact_path and os.path.exists(model.artifact_path) and model.model_version == table.model_version:
+            _link(model.artifact_path, os.path.join(generation_dir, MODEL_FILE))
+            manifest['model_artifact'] = MODEL_FILE
+        
+        surface = self.demand_surface
+        if surface is not None and len(surface.reachable) == len(store):
+            _save(generation_dir, 'demand_reachable', surface.reachable)
+            _save(generation_dir, 'demand_nearest', surface.nearest)
+            _save(generation_dir, 'demand_nearest_km', surface.nearest_km)
+            manifest['demand_surface'] = {
+                **self._surface_config(surface),
+                'centers': [center.model_dump(mode='json') for center in surface.centers]
+            }
+        
+        _commit(self.root, generation, manifest, self.keep_generations)
+        return generation
+    
+    @staticmethod
+    def _surface_config(surface: DemandSurface) -> Dict[str, Any]:
+        return {
+            'radii_km': surface.radii_km.tolist(),
+            'scoring_radius_km': surface.scoring_radius_km,
+            'nearest_k': surface.nearest_k,
+            'horizon_years': surface.horizon_years
+        }
+    
+    def attach(self, generation: str):
+        """Memory-map a published generation into the table, demand surface and model"""
+        start = time.perf_counter()
+        generation_dir = os.path.join(self.root, generation)
+        manifest = read_manifest(self.root, generation)
+        model = self.table.model
+        base_scores = (
+            _load(generation_dir, 'base_scores')
+            if os.path.exists(os.path.join(generation_dir, 'base_scores.npy')) else None
+        )
+        
+        if manifest['sites_generation'] == self.sites_generation and self.table.version == self._attached_table_version:
+            # Only the model changed and this worker still holds exactly the attached sites
+            self.table.attach_base_scores(base_scores, manifest['model_version'])
+        else:
+            store = SiteStore.from_columns(
+                _load_packed(generation_dir, 'site_ids').tolist(),
+                manifest['state_categories'],
+                {
+                    name: _load_packed(generation_dir, name) if dtype is object else _load(generation_dir, name)
+                    for name, (dtype, _) in COLUMN_SPECS.items()
+                }
+            )
+            surface, surface_manifest = self.demand_surface, manifest['demand_surface']
+            if surface is not None and surface_manifest is not None and all(
+                surface_manifest[key] == value for key, value in self._surface_config(surface).items()
+            ):
+                surface.attach(
+                    [DemandCenter(**center) for center in surface_manifest['centers']],
+                    _load(generation_dir, 'demand_reachable'),
+                    _load(generation_dir, 'demand_nearest'),
+                    _load(generation_dir, 'demand_nearest_km'),
+                    store
+                )
+            # Otherwise the demand surface recomputes itself from the attached sites
+            self.table.attach(store, _load(generation_dir, 'components'), base_scores,
+                              _load(generation_dir, 'demand'), manifest['model_version'])
+        
+        # The table already holds this model's scores, so loading it does not rescore the sites
+        if manifest['model_artifact'] and model.model_version != manifest['model_version']:
+            model.load_model(
+                train_if_missing=False, mmap_mode='r',
+                artifact_path=os.path.join(generation_dir, manifest['model_artifact'])
+            )
+        
+        self.generation = generation
+        self.sites_generation = manifest['sites_generation']
+        self._attached_table_version = self.table.version
+        self.attach_seconds = time.perf_counter() - start
+        logger.info(f"Attached shared state generation {generation} in {self.attach_seconds:.3f}s")
+    
+    def refresh(self) -> bool:
+        """Attach the current generation unless it is attached already; False when none is published"""
+        generation = read_pointer(self.root)
+        if generation is None:
+            return False
+        with self._attach_lock:
+            if generation != self.generation:
+                self.attach(generation)
+        return True
+    
+    def start_watching(self):
+        """Poll the generation pointer in a background thread, attaching each new generation"""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="shared-state-watcher", daemon=True)
+        self._watcher.start()
+    
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval_s):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error attaching shared state generation: {str(e)}")
+    
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+    
+    def retrain(self, data_path: Optional[str] = None) -> Future:
+        """Train a model into a new generation in a separate process; every worker attaches it"""
+        if self._training_future is not None and not self._training_future.done():
+            logger.info("Model training already in progress")
+            return self._training_future
+        if training_locked(self.root):
+            # Another worker is training; its generation reaches this one at the next poll
+            logger.info("Model training already in progress in another worker")
+            future = Future()
+            future.set_result(None)
+            return future
+        
+        executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        future = executor.submit(train_generation, self.root, data_path, self.keep_generations)
+        future.add_done_callback(self._on_training_done)
+        executor.shutdown(wait=False)
+        self._training_future = future
+        logger.info("Model training for a new shared state generation started in a background process")
+        return future
+    
+    @property
+    def training_in_progress(self) -> bool:
+        """Whether this or any other worker is training a new generation"""
+        if self._training_future is not None and not self._training_future.done():
+            return True
+        return os.path.isdir(self.root) and training_locked(self.root)
+    
+    def _on_training_done(self, future: Future):
+        try:
+            if future.result() is None:
+                # Lost the race to another worker's training run; its generation arrives by polling
+                return
+            # Attach right away here; other workers follow at their next poll
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Background model training failed: {str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "generation": self.generation,
+            "current_generation": read_pointer(self.root),
+            "sites_generation": self.sites_generation,
+            "last_attach_seconds": self.attach_seconds,
+            "training": self.training_in_progress
+        }
@@ -0,0 +1,177 @@
+import logging
+import os
+import time
+from typing import Any, Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+from models.data_models import LandType, PolicyZone
+from services.site_scores import SiteScoreTable
+from services.site_store import FEATURE_COLUMNS, LAND_TYPES, POLICY_ZONES, INFRASTRUCTURE_TYPES
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = [
+    'id', 'name', 'latitude', 'longitude', 'state', 'district',
+    *FEATURE_COLUMNS,
+    'land_type', 'policy_zone', 'estimated_roi', 'project_timeline'
+]
+OPTIONAL_COLUMNS = ['existing_infrastructure', 'policy_incentives', 'suitability_score', 'annual_sunshine']
+
+# Inclusive (min, max) bounds mirroring the SiteData field constraints
+RANGE_CHECKS = {
+    'latitude': (-90, 90),
+    'longitude': (-180, 180),
+    'solar_index': (0, 100),
+    'wind_index': (0, 100),
+    'water_index': (0, 100),
+    'industry_proximity': (0, np.inf),
+    'grid_proximity': (0, np.inf),
+    'water_source_distance': (0, np.inf),
+    'land_availability': (0, 10),
+    'elevation': (-np.inf, np.inf),
+}
+
+# List-valued columns are stored as ';'-separated strings in flat files
+LIST_SEPARATOR = ';'
+
+def _read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield DataFrame chunks from a CSV or Parquet file"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.parquet', '.pq'):
+        import pyarrow.parquet as pq
+        
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    elif extension in ('.csv', '.gz'):
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype={'id': str, 'state': str, 'district': str})
+    else:
+        raise ValueError(f"Unsupported site catalogue format: {extension}")
+
+def _validate(chunk: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Vectorized checks; returns a mask of failing rows per reason"""
+    failures = {}
+    for column in ('id', 'name', 'state', 'district', 'estimated_roi', 'project_timeline'):
+        failures[f"missing {column}"] = chunk[column].isna().to_numpy()
+    
+    for column, (low, high) in RANGE_CHECKS.items():
+        values = chunk[column].to_numpy(dtype=float)
+        failures[f"{column} outside [{low}, {high}]"] = ~((values >= low) & (values <= high))
+    
+    if 'suitability_score' in chunk:
+        scores = chunk['suitability_score'].to_numpy(dtype=float)
+        failures["suitability_score outside [0, 100]"] = ~(np.isnan(scores) | ((scores >= 0) & (scores <= 100)))
+    
+    failures["unknown land_type"] = ~chunk['land_type'].isin([kind.value for kind in LandType]).to_numpy()
+    failures["unknown policy_zone"] = ~chunk['policy_zone'].isin([zone.value for zone in PolicyZone]).to_numpy()
+    
+    # The bitmask has no slot for unknown infrastructure, so reject rather than silently drop it
+    infrastructure_codes, infrastructure_values = _split_list_column(chunk, 'existing_infrastructure')
+    known = {infra.value for infra in INFRASTRUCTURE_TYPES}
+    distinct_known = np.array([set(items) <= known for items in infrastructure_values], dtype=bool)
+    failures["unknown existing_infrastructure"] = ~distinct_known[infrastructure_codes]
+    return failures
+
+def _split_list_column(chunk: pd.DataFrame, column: str):
+    """Factorize a ';'-separated list column and parse each distinct value once"""
+    if column not in chunk:
+        return np.zeros(len(chunk), dtype=np.intp), [()]
+    codes, uniques = pd.factorize(chunk[column].fillna('').astype(str))
+    parsed = [tuple(item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()) for value in uniques]
+    return codes, parsed
+
+def _to_columns(chunk: pd.DataFrame, table: SiteScoreTable) -> Dict[str, np.ndarray]:
+    """Convert a validated chunk straight into SiteStore columns"""
+    n_rows = len(chunk)
+    state_codes, state_values = pd.factorize(chunk['state'])
+    state_mapping = table.state_codes(list(state_values))
+    
+    # Catalogues repeat a handful of list values, so bits and tuples are built per distinct value
+    infrastructure_codes, infrastructure_values = _split_list_column(chunk, 'existing_infrastructure')
+    distinct_bits = np.array([
+        sum(1 << bit for bit, infra in enumerate(INFRASTRUCTURE_TYPES) if infra.value in items)
+        for items in infrastructure_values
+    ], dtype=np.uint8)
+    
+    incentive_codes, incentive_values = _split_list_column(chunk, 'policy_incentives')
+    distinct_incentives = np.empty(len(incentive_values), dtype=object)
+    distinct_incentives[:] = incentive_values
+    
+    def optional_text(column: str) -> np.ndarray:
+        if column not in chunk:
+            return np.full(n_rows, None, dtype=object)
+        return chunk[column].astype(object).where(chunk[column].notna(), None).to_numpy(dtype=object)
+    
+    return {
+        'features': chunk[FEATURE_COLUMNS].to_numpy(dtype=np.float32),
+        'coordinates': chunk[['latitude', 'longitude']].to_numpy(dtype=np.float64),
+        'state_code': state_mapping[state_codes],
+        'land_type_code': pd.Categorical(chunk['land_type'], categories=[kind.value for kind in LAND_TYPES]).codes.astype(np.uint8),
+        'policy_zone_code': pd.Categorical(chunk['policy_zone'], categories=[zone.value for zone in POLICY_ZONES]).codes.astype(np.uint8),
+        'infrastructure_bits': distinct_bits[infrastructure_codes],
+        'suitability_score': (
+            chunk['suitability_score'].to_numpy(dtype=np.float32) if 'suitability_score' in chunk
+            else np.full(n_rows, np.nan, dtype=np.float32)
+        ),
+        'name': chunk['name'].astype(str).to_numpy(dtype=object),
+        'district': chunk['district'].astype(str).to_numpy(dtype=object),
+        'policy_incentives': distinct_incentives[incentive_codes],
+        'estimated_roi': chunk['estimated_roi'].astype(str).to_numpy(dtype=object),
+        'project_timeline': chunk['project_timeline'].astype(str).to_numpy(dtype=object),
+        'annual_sunshine': optional_text('annual_sunshine'),
+    }
+
+def ingest_site_file(path: str, table: SiteScoreTable, chunk_size: int = 100_000,
+                     max_reported_rejections: int = 100) -> Dict[str, Any]:
+    """Bulk-load a CSV/Parquet site catalogue into the site table in bounded-memory chunks"""
+    start = time.perf_counter()
+    accepted = 0
+    rejected = 0
+    reason_counts: Dict[str, int] = {}
+    rejections: List[Dict[str, Any]] = []
+    row_offset = 0
+    
+    for chunk in _read_chunks(path, chunk_size):
+        missing = [column for column in REQUIRED_COLUMNS if column not in chunk]
+        if missing:
+            raise ValueError(f"Site catalogue is missing columns: {missing}")
+        
+        chunk = chunk.reset_index(drop=True)
+        numeric = list(RANGE_CHECKS) + (['suitability_score'] if 'suitability_score' in chunk else [])
+        chunk[numeric] = chunk[numeric].apply(pd.to_numeric, errors='coerce')
+        
+        failures = _validate(chunk)
+        invalid = np.logical_or.reduce(list(failures.values()))
+        for reason, mask in failures.items():
+            count = int(mask.sum())
+            if count:
+                reason_counts[reason] = reason_counts.get(reason, 0) + count
+        
+        # Reasons are only assembled per row for the few rejected rows that get reported
+        for index in np.flatnonzero(invalid)[:max(0, max_reported_rejections - len(rejections))]:
+            rejections.append({
+                'row': row_offset + int(index),
+                'id': None if pd.isna(chunk['id'].iat[index]) else str(chunk['id'].iat[index]),
+                'reasons': [reason for reason, mask in failures.items() if mask[index]]
+            })
+        
+        valid_chunk = chunk[~invalid]
+        if len(valid_chunk):
+            table.upsert_columns(valid_chunk['id'].astype(str).tolist(), _to_columns(valid_chunk, table))
+        
+        accepted += len(valid_chunk)
+        rejected += int(invalid.sum())
+        row_offset += len(chunk)
+        logger.info(f"Ingested {row_offset} rows from {path} ({rejected} rejected)")
+    
+    elapsed = time.perf_counter() - start
+    logger.info(f"Ingest of {path} finished: {accepted} accepted, {rejected} rejected in {elapsed:.2f}s")
+    return {
+        'accepted': accepted,
+        'rejected': rejected,
+        'rejection_reasons': reason_counts,
+        'rejections': rejections,
+        'elapsed_seconds': elapsed
+    }
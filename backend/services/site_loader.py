@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from models.data_models import SiteData
+
+logger = logging.getLogger(__name__)
+
+class SiteDataLoader:
+    """Batches, coalesces and bounds enhanced site data fetches against the data service"""
+    
+    def __init__(self, data_service: Any, max_concurrency: int = 16):
+        self.data_service = data_service
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._tasks = set()
+        self.requested = 0
+        self.coalesced = 0
+        self.fetched = 0
+        self.bulk_calls = 0
+    
+    async def get_enhanced_site_data(self, site_id: str) -> Optional[SiteData]:
+        return (await self.get_enhanced_site_data_many([site_id]))[0]
+    
+    async def get_enhanced_site_data_many(self, site_ids: List[str]) -> List[Optional[SiteData]]:
+        """Site data for each id, in order; duplicates and fetches already in flight are shared"""
+        loop = asyncio.get_running_loop()
+        futures: Dict[str, asyncio.Future] = {}
+        missing: Dict[str, asyncio.Future] = {}
+        for site_id in site_ids:
+            self.requested += 1
+            if site_id in futures:
+                self.coalesced += 1
+                continue
+            future = self._in_flight.get(site_id)
+            if future is None:
+                future = self._in_flight[site_id] = missing[site_id] = loop.create_future()
+            else:
+                self.coalesced += 1
+            futures[site_id] = future
+        
+        if missing:
+            # A separate task, so a cancelled caller cannot abort a fetch others are waiting on
+            task = loop.create_task(self._fetch(missing))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        
+        unique_ids = list(futures)
+        results = await asyncio.gather(*(asyncio.shield(futures[site_id]) for site_id in unique_ids))
+        by_id = dict(zip(unique_ids, results))
+        return [by_id[site_id] for site_id in site_ids]
+    
+    async def _fetch(self, futures: Dict[str, asyncio.Future]):
+        site_ids = list(futures)
+        try:
+            bulk = getattr(self.data_service, "get_enhanced_site_data_many", None)
+            if bulk is not None:
+                # One round trip when the data service supports it; results come back in id order
+                self.bulk_calls += 1
+                async with self._semaphore:
+                    results = await bulk(site_ids)
+                for site_id, site_data in zip(site_ids, results):
+                    self._resolve(site_id, futures[site_id], result=site_data)
+            else:
+                await asyncio.gather(*(self._fetch_one(site_id, futures[site_id]) for site_id in site_ids))
+            self.fetched += len(site_ids)
+        except Exception as e:
+            logger.error(f"Error fetching site data: {str(e)}")
+            for site_id in site_ids:
+                self._resolve(site_id, futures[site_id], error=e)
+        finally:
+            # Anything the data service did not answer resolves to "not found"
+            for site_id in site_ids:
+                self._resolve(site_id, futures[site_id], result=None)
+    
+    async def _fetch_one(self, site_id: str, future: asyncio.Future):
+        async with self._semaphore:
+            try:
+                site_data = await self.data_service.get_enhanced_site_data(site_id)
+            except Exception as e:
+                self._resolve(site_id, future, error=e)
+                return
+        self._resolve(site_id, future, result=site_data)
+    
+    def _resolve(self, site_id: str, future: asyncio.Future, result: Optional[SiteData] = None,
+                 error: Optional[Exception] = None):
+        if self._in_flight.get(site_id) is future:
+            del self._in_flight[site_id]
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": len(self._in_flight),
+            "requested": self.requested,
+            "coalesced": self.coalesced,
+            "fetched": self.fetched,
+            "bulk_calls": self.bulk_calls
+        }
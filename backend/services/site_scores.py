@@ -0,0 +1,264 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.data_models import SiteData, CriteriaWeights
+from models.suitability_model import HydrogenSuitabilityModel
+from services.site_store import SiteStore, FEATURE_COLUMNS, LAND_TYPES, POLICY_ZONES, dedupe_latest
+
+logger = logging.getLogger(__name__)
+
+class SiteScoreTable:
+    """Precomputed per-site ML base scores and criteria components for fast re-weighting"""
+    
+    def __init__(self, model: HydrogenSuitabilityModel):
+        if list(model.feature_names) != FEATURE_COLUMNS:
+            raise ValueError("Site store feature columns do not match the model feature names")
+        
+        self.model = model
+        self.store = SiteStore()
+        self.components = np.empty((0, 6), dtype=np.float32)
+        self.base_scores: Optional[np.ndarray] = np.empty(0)
+        # Per-site demand criterion (0-1), filled in by a DemandSurface when one is attached
+        self.demand = np.zeros(0, dtype=np.float32)
+        self.model_version: Optional[str] = None
+        # Bumped on every change to the stored sites or scores
+        self.version = 0
+        self._lock = threading.Lock()
+        self._change_listeners: List[Callable[[str, np.ndarray], None]] = []
+    
+    def add_change_listener(self, listener: Callable[[str, np.ndarray], None]):
+        """Register a callback run with ('load' | 'upsert' | 'rescore', rows) after every change"""
+        self._change_listeners.append(listener)
+    
+    def _notify(self, event: str, rows: np.ndarray):
+        for listener in self._change_listeners:
+            try:
+                listener(event, rows)
+            except Exception as e:
+                logger.error(f"Error in site table change listener: {str(e)}")
+    
+    def __len__(self) -> int:
+        return len(self.store)
+    
+    def __contains__(self, site_id: str) -> bool:
+        return site_id in self.store
+    
+    @property
+    def site_ids(self) -> List[str]:
+        return self.store.site_ids
+    
+    @property
+    def names(self) -> np.ndarray:
+        return self.store.columns['name']
+    
+    @property
+    def coordinates(self) -> np.ndarray:
+        return self.store.coordinates
+    
+    @property
+    def features(self) -> np.ndarray:
+        return self.store.features
+    
+    def describe(self, row: int) -> Dict[str, Any]:
+        """Compact identifying fields of a site for list payloads"""
+        return {
+            'site_id': self.store.site_ids[row],
+            'site_name': self.store.columns['name'][row],
+            'state': self.store.state(row),
+            'coordinates': self.store.coordinates[row].tolist()
+        }
+    
+    def load(self, sites: List[SiteData]):
+        """Replace the table with the given sites and score them once"""
+        store = SiteStore()
+        store.upsert_sites(sites)
+        components = self.model.component_scores(store.features).astype(np.float32)
+        base_scores = self.model.predict_base_scores(store.features) if len(store) else np.empty(0)
+        
+        with self._lock:
+            self.store = store
+            self.components = components
+            self.base_scores = base_scores
+            self.demand = np.zeros(len(store), dtype=np.float32)
+            self.model_version = self.model.model_version
+            self.version += 1
+        logger.info(f"Precomputed base scores for {len(store)} sites")
+        self._notify('load', np.arange(len(store)))
+        
+        # The model may have finished loading in the background while these sites were scored without it
+        if base_scores is None and self.model.model is not None:
+            self.refresh_base_scores()
+    
+    def attach(self, store: SiteStore, components: np.ndarray, base_scores: Optional[np.ndarray],
+               demand: np.ndarray, model_version: Optional[str]):
+        """Replace the table with sites scored elsewhere, e.g. arrays memory-mapped from a shared snapshot"""
+        with self._lock:
+            self.store = store
+            self.components = components
+            self.base_scores = base_scores
+            self.demand = demand
+            self.model_version = model_version
+            self.version += 1
+        logger.info(f"Attached {len(store)} precomputed sites (model {model_version})")
+        self._notify('load', np.arange(len(store)))
+    
+    def attach_base_scores(self, base_scores: Optional[np.ndarray], model_version: Optional[str]):
+        """Swap in base scores computed elsewhere for the current sites, ahead of the matching model"""
+        with self._lock:
+            self.base_scores = base_scores
+            self.model_version = model_version
+            self.version += 1
+        self._notify('rescore', np.arange(len(self.store)))
+    
+    def state_codes(self, states: List[str]) -> np.ndarray:
+        """Categorical codes for state names, adding new categories under the table lock"""
+        with self._lock:
+            return self.store.state_codes(states)
+    
+    def upsert_sites(self, sites: List[SiteData]) -> np.ndarray:
+        """Add or refresh several sites; returns their rows"""
+        with self._lock:
+            columns = self.store.columns_from_sites(sites)
+        return self.upsert_columns([site.id for site in sites], columns)
+    
+    def upsert_columns(self, site_ids: List[str], columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Add or refresh sites given as column arrays; returns their rows"""
+        site_ids, columns = dedupe_latest(site_ids, columns)
+        features = columns['features']
+        components = self.model.component_scores(features).astype(np.float32)
+        base_scores = self.model.predict_base_scores(features)
+        
+        with self._lock:
+            rows = self.store.upsert_columns(site_ids, columns)
+            n_sites = len(self.store)
+            if len(self.components) < n_sites:
+                grow = n_sites - len(self.components)
+                self.components = np.concatenate([self.components, np.zeros((grow, 6), dtype=np.float32)])
+                self.demand = np.concatenate([self.demand, np.zeros(grow, dtype=np.float32)])
+                if self.base_scores is not None:
+                    self.base_scores = np.concatenate([self.base_scores, np.full(grow, np.nan)])
+            
+            self.components[rows] = components
+            if self.base_scores is not None and base_scores is not None:
+                self.base_scores[rows] = base_scores
+            else:
+                self.base_scores = None
+            self.version += 1
+        
+        self._notify('upsert', rows)
+        
+        # Sites scored without the model force a full rescore once the model is back
+        if self.base_scores is None and self.model.model is not None:
+            self.refresh_base_scores()
+        return rows
+    
+    def refresh_base_scores(self):
+        """Re-run the model over the stored features, e.g. after a retrain"""
+        with self._lock:
+            if self.base_scores is not None and self.model_version == self.model.model_version:
+                # Already scored by this model, e.g. attached together with it
+                return
+            store = self.store
+            features = store.features
+        base_scores = self.model.predict_base_scores(features) if len(features) else np.empty(0)
+        
+        with self._lock:
+            # Sites may have been added meanwhile; only swap in if the table is unchanged
+            refreshed = self.store is store and len(store) == len(features)
+            if refreshed:
+                self.base_scores = base_scores
+                self.model_version = self.model.model_version
+                self.version += 1
+        logger.info(f"Refreshed base scores for {len(features)} sites (model {self.model_version})")
+        if refreshed:
+            self._notify('rescore', np.arange(len(features)))
+    
+    def set_demand(self, rows: np.ndarray, demand: np.ndarray, store: SiteStore):
+        """Store the demand criterion of the given rows of store"""
+        with self._lock:
+            if self.store is not store:
+                # The table was reloaded since these values were computed; the reload recomputes them
+                return
+            self.demand[rows] = demand
+            self.version += 1
+    
+    def score_all(self, weights: CriteriaWeights) -> np.ndarray:
+        """Suitability of every site under the given weights, in site_ids order"""
+        with self._lock:
+            components, base_scores, demand = self.components, self.base_scores, self.demand
+        return self.model.combine_scores(components, base_scores, weights, demand)
+    
+    def score_rows(self, rows: np.ndarray, weights: CriteriaWeights) -> np.ndarray:
+        """Suitability of the given table rows under the given weights"""
+        with self._lock:
+            components = self.components[rows]
+            base_scores = self.base_scores[rows] if self.base_scores is not None else None
+            demand = self.demand[rows]
+        return self.model.combine_scores(components, base_scores, weights, demand)
+    
+    def effective_scores(self, rows: np.ndarray, weights: CriteriaWeights) -> np.ndarray:
+        """Stored suitability_score of each row, or its model score under weights where none is stored"""
+        scores = self.store.columns['suitability_score'][rows].astype(np.float64)
+        unscored = np.isnan(scores)
+        if unscored.any():
+            scores[unscored] = self.score_rows(rows[unscored], weights)
+        return scores
+    
+    def rows_for(self, site_ids: List[str]) -> np.ndarray:
+        """Table rows of the given site ids, -1 for unknown sites"""
+        return self.store.rows_for(site_ids)
+    
+    def score_rows_many(self, rows: np.ndarray, weights_list: List[CriteriaWeights]) -> np.ndarray:
+        """Suitability of the given rows under several weight sets, shape (n_rows, n_weight_sets)"""
+        with self._lock:
+            components = self.components[rows]
+            base_scores = self.base_scores[rows] if self.base_scores is not None else None
+            demand = self.demand[rows]
+        return self.model.combine_scores_many(components, base_scores, weights_list, demand)
+    
+    def filter_mask(self, state: Optional[str] = None, policy_zone: Optional[str] = None,
+                    land_type: Optional[str] = None) -> np.ndarray:
+        """Boolean row mask for the given categorical filters"""
+        columns = self.store.columns
+        mask = np.ones(len(self.store), dtype=bool)
+        if state is not None:
+            code = self.store.state_code(state)
+            if code is None:
+                return np.zeros(len(self.store), dtype=bool)
+            mask &= columns['state_code'] == code
+        if policy_zone is not None:
+            mask &= columns['policy_zone_code'] == [zone.value for zone in POLICY_ZONES].index(policy_zone)
+        if land_type is not None:
+            mask &= columns['land_type_code'] == [kind.value for kind in LAND_TYPES].index(land_type)
+        return mask
+    
+    def candidates(self, state: Optional[str] = None, policy_zone: Optional[str] = None,
+                   land_type: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, Optional[np.ndarray], np.ndarray]:
+        """Ascending rows matching the filters with their components, base scores and demand, read consistently"""
+        with self._lock:
+            components, base_scores, demand = self.components, self.base_scores, self.demand
+            mask = self.filter_mask(state, policy_zone, land_type)
+        
+        rows = np.flatnonzero(mask)
+        if len(rows) < len(mask):
+            components = components[rows]
+            base_scores = base_scores[rows] if base_scores is not None else None
+            demand = demand[rows]
+        return rows, components, base_scores, demand
+    
+    def top_k(self, weights: CriteriaWeights, k: int, state: Optional[str] = None,
+              policy_zone: Optional[str] = None, land_type: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+        """Rows and scores of the k best sites matching the filters, plus the candidate count"""
+        rows, components, base_scores, demand = self.candidates(state, policy_zone, land_type)
+        scores = self.model.combine_scores(components, base_scores, weights, demand)
+        
+        # Partial selection of the k best, then sort only those
+        if k < len(scores):
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return rows[best], scores[best], len(rows)
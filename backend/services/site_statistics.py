@@ -0,0 +1,180 @@
+import logging
+import threading
+from typing import Any, List, Optional
+
+import numpy as np
+
+from models.data_models import CriteriaWeights, Statistics
+from services.site_scores import SiteScoreTable
+from services.site_store import FEATURE_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Lower score bound of each category, matching the frontend's suitability labels
+SCORE_CATEGORIES = [('Excellent', 80), ('Good', 60), ('Moderate', 40), ('Poor', 0)]
+RESOURCE_COLUMNS = {
+    'solar': FEATURE_COLUMNS.index('solar_index'),
+    'wind': FEATURE_COLUMNS.index('wind_index'),
+    'water': FEATURE_COLUMNS.index('water_index'),
+    'land': FEATURE_COLUMNS.index('land_availability'),
+}
+
+def _categories(scores: np.ndarray) -> np.ndarray:
+    """Index into SCORE_CATEGORIES for each score"""
+    bounds = np.array([bound for _, bound in SCORE_CATEGORIES[:-1]])[::-1]
+    return len(bounds) - np.searchsorted(bounds, scores, side='right')
+
+class SiteStatistics:
+    """Aggregates over the site table, kept current as running sums from its change events"""
+    
+    def __init__(self, table: SiteScoreTable, weights: Optional[CriteriaWeights] = None, top_states: int = 5):
+        self.table = table
+        # Sites without a stored score are counted at their model score under these weights
+        self.weights = weights or CriteriaWeights()
+        self.top_states = top_states
+        self._lock = threading.Lock()
+        self._reset()
+        table.add_change_listener(self._on_change)
+        # Count sites already in the table; later changes arrive as events
+        self.update(np.arange(len(table)))
+    
+    def _reset(self):
+        # Contribution currently counted for each table row
+        self._row_scores = np.zeros(0)
+        self._row_states = np.zeros(0, dtype=np.int64)
+        self._row_resources = np.zeros((0, len(RESOURCE_COLUMNS)))
+        self._row_counted = np.zeros(0, dtype=bool)
+        
+        self.total_sites = 0
+        self.score_sum = 0.0
+        self.category_counts = np.zeros(len(SCORE_CATEGORIES), dtype=np.int64)
+        self.state_counts = np.zeros(0, dtype=np.int64)
+        self.state_sums = np.zeros(0)
+        self.resource_sums = np.zeros(len(RESOURCE_COLUMNS))
+        self._snapshot: Optional[Statistics] = None
+        # Bumped whenever the aggregates change
+        self.version = getattr(self, 'version', 0) + 1
+    
+    def _row_values(self, rows: np.ndarray):
+        """Effective score, state code and resource values of the given rows"""
+        columns = self.table.store.columns
+        scores = self.table.effective_scores(rows, self.weights)
+        resources = self.table.store.features[rows][:, list(RESOURCE_COLUMNS.values())].astype(np.float64)
+        return scores, columns['state_code'][rows].astype(np.int64), resources
+    
+    def _accumulate(self, scores: np.ndarray, states: np.ndarray, resources: np.ndarray, sign: int):
+        n_states = int(states.max()) + 1 if len(states) else 0
+        if n_states > len(self.state_counts):
+            grow = n_states - len(self.state_counts)
+            self.state_counts = np.concatenate([self.state_counts, np.zeros(grow, dtype=np.int64)])
+            self.state_sums = np.concatenate([self.state_sums, np.zeros(grow)])
+        
+        self.total_sites += sign * len(scores)
+        self.score_sum += sign * scores.sum()
+        self.category_counts += sign * np.bincount(_categories(scores), minlength=len(SCORE_CATEGORIES))
+        self.state_counts[:n_states] += sign * np.bincount(states, minlength=n_states)
+        self.state_sums[:n_states] += sign * np.bincount(states, weights=scores, minlength=n_states)
+        self.resource_sums += sign * resources.sum(axis=0)
+    
+    def update(self, rows: np.ndarray):
+        """Swap the counted contribution of the given rows for their current values"""
+        rows = np.asarray(rows, dtype=np.intp)
+        with self._lock:
+            n_rows = len(self.table)
+            if len(self._row_counted) < n_rows:
+                grow = n_rows - len(self._row_counted)
+                self._row_scores = np.concatenate([self._row_scores, np.zeros(grow)])
+                self._row_states = np.concatenate([self._row_states, np.zeros(grow, dtype=np.int64)])
+                self._row_resources = np.concatenate([self._row_resources, np.zeros((grow, len(RESOURCE_COLUMNS)))])
+                self._row_counted = np.concatenate([self._row_counted, np.zeros(grow, dtype=bool)])
+            if not len(rows):
+                return
+            
+            counted = rows[self._row_counted[rows]]
+            self._accumulate(self._row_scores[counted], self._row_states[counted], self._row_resources[counted], -1)
+            
+            scores, states, resources = self._row_values(rows)
+            self._accumulate(scores, states, resources, 1)
+            self._row_scores[rows] = scores
+            self._row_states[rows] = states
+            self._row_resources[rows] = resources
+            self._row_counted[rows] = True
+            self._snapshot = None
+            self.version += 1
+    
+    def _on_change(self, event: str, rows: np.ndarray):
+        if event == 'load':
+            with self._lock:
+                self._reset()
+        self.update(rows)
+    
+    def statistics(self) -> Statistics:
+        """Current aggregates; O(number of states), independent of the number of sites"""
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build(
+                    self.total_sites, self.score_sum, self.category_counts,
+                    self.state_counts, self.state_sums, self.resource_sums
+                )
+            return self._snapshot
+    
+    def _build(self, total_sites: int, score_sum: float, category_counts: np.ndarray,
+               state_counts: np.ndarray, state_sums: np.ndarray, resource_sums: np.ndarray) -> Statistics:
+        present = np.flatnonzero(state_counts > 0)
+        averages = state_sums[present] / state_counts[present]
+        order = np.argsort(-averages, kind='stable')[:self.top_states]
+        return Statistics(
+            total_sites=total_sites,
+            average_score=score_sum / total_sites if total_sites else 0.0,
+            score_distribution={name: int(count) for (name, _), count in zip(SCORE_CATEGORIES, category_counts)},
+            top_states=[
+                {
+                    'state': self.table.store.state_categories[present[i]],
+                    'average_score': float(averages[i]),
+                    'site_count': int(state_counts[present[i]])
+                }
+                for i in order
+            ],
+            resource_availability={
+                name: float(value / total_sites) if total_sites else 0.0
+                for name, value in zip(RESOURCE_COLUMNS, resource_sums)
+            }
+        )
+    
+    def recompute(self) -> Statistics:
+        """The same aggregates computed from scratch over every site"""
+        with self._lock:
+            scores, states, resources = self._row_values(np.arange(len(self.table)))
+        n_states = int(states.max()) + 1 if len(states) else 0
+        return self._build(
+            len(scores),
+            scores.sum(),
+            np.bincount(_categories(scores), minlength=len(SCORE_CATEGORIES)),
+            np.bincount(states, minlength=n_states),
+            np.bincount(states, weights=scores, minlength=n_states),
+            resources.sum(axis=0)
+        )
+    
+    def check_consistency(self, tolerance: float = 1e-6) -> List[str]:
+        """Differences between the running aggregates and a full recomputation"""
+        incremental = self.statistics().model_dump()
+        full = self.recompute().model_dump()
+        mismatches = []
+        
+        def compare(path: str, a: Any, b: Any):
+            if isinstance(a, dict) and isinstance(b, dict):
+                for key in sorted(set(a) | set(b)):
+                    compare(f"{path}.{key}", a.get(key), b.get(key))
+            elif isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+                for i, (x, y) in enumerate(zip(a, b)):
+                    compare(f"{path}[{i}]", x, y)
+            elif isinstance(a, float) and isinstance(b, float):
+                if abs(a - b) > tolerance * max(1.0, abs(b)):
+                    mismatches.append(f"{path}: {a} != {b}")
+            elif a != b:
+                mismatches.append(f"{path}: {a!r} != {b!r}")
+        
+        compare("statistics", incremental, full)
+        if mismatches:
+            logger.warning(f"Site statistics drifted from a full recomputation: {mismatches[:5]}")
+        return mismatches
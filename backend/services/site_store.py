@@ -0,0 +1,248 @@
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.data_models import SiteData, LandType, PolicyZone, InfrastructureType
+
+logger = logging.getLogger(__name__)
+
+# Numeric columns in HydrogenSuitabilityModel.feature_names order
+FEATURE_COLUMNS = [
+    'solar_index', 'wind_index', 'water_index',
+    'industry_proximity', 'grid_proximity', 'land_availability',
+    'elevation', 'water_source_distance'
+]
+LAND_TYPES = list(LandType)
+POLICY_ZONES = list(PolicyZone)
+INFRASTRUCTURE_TYPES = list(InfrastructureType)
+
+# (dtype, trailing shape) of every column
+COLUMN_SPECS = {
+    'features': (np.float32, (len(FEATURE_COLUMNS),)),
+    'coordinates': (np.float64, (2,)),
+    'state_code': (np.int32, ()),
+    'land_type_code': (np.uint8, ()),
+    'policy_zone_code': (np.uint8, ()),
+    'infrastructure_bits': (np.uint8, ()),
+    'suitability_score': (np.float32, ()),
+    'name': (object, ()),
+    'district': (object, ()),
+    'policy_incentives': (object, ()),
+    'estimated_roi': (object, ()),
+    'project_timeline': (object, ()),
+    'annual_sunshine': (object, ()),
+}
+
+def _compact_float(value: np.float32) -> float:
+    """Python float with the shortest repr that round-trips the float32 value"""
+    return float(str(value))
+
+def _object_column(values: List[Any]) -> np.ndarray:
+    """1-D object array, even when the values are themselves sequences"""
+    column = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        column[i] = value
+    return column
+
+class PackedColumn:
+    """Read-only object column held as comma-separated JSON values plus row offsets.
+    
+    Both arrays can be memory-mapped, so a column shared between processes costs no private
+    memory; values are decoded per row on access.
+    """
+    
+    dtype = np.dtype(object)
+    
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        self.data = data
+        # Row i spans data[offsets[i]:offsets[i + 1] - 1]; the byte before the next row is a comma
+        self.offsets = offsets
+    
+    @classmethod
+    def pack(cls, values) -> 'PackedColumn':
+        encoded = [json.dumps(value, separators=(',', ':')).encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(value) + 1 for value in encoded])
+        return cls(np.frombuffer(b','.join(encoded), dtype=np.uint8), offsets)
+    
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+    
+    def __getitem__(self, row: int) -> Any:
+        return json.loads(self.data[self.offsets[row]:self.offsets[row + 1] - 1].tobytes())
+    
+    def tolist(self) -> List[Any]:
+        """Every value, decoded in a single pass"""
+        return json.loads(b'[' + self.data.tobytes() + b']')
+
+def dedupe_latest(site_ids: List[str], columns: Dict[str, np.ndarray]) -> Tuple[List[str], Dict[str, np.ndarray]]:
+    """Drop all but the last occurrence of each site id in a batch"""
+    site_ids = list(site_ids)
+    latest = {site_id: i for i, site_id in enumerate(site_ids)}
+    if len(latest) == len(site_ids):
+        return site_ids, columns
+    keep = np.array(sorted(latest.values()), dtype=np.intp)
+    return [site_ids[i] for i in keep], {name: values[keep] for name, values in columns.items()}
+
+class SiteStore:
+    """Columnar in-memory site catalogue; SiteData records are only built on demand.
+    
+    Not thread-safe on its own; callers serialize writes.
+    """
+    
+    def __init__(self):
+        self.site_ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self.state_categories: List[str] = []
+        self._state_codes: Dict[str, int] = {}
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.empty((0,) + shape, dtype=dtype) for name, (dtype, shape) in COLUMN_SPECS.items()
+        }
+    
+    def __len__(self) -> int:
+        return len(self.site_ids)
+    
+    def __contains__(self, site_id: str) -> bool:
+        return site_id in self._positions
+    
+    @property
+    def features(self) -> np.ndarray:
+        return self.columns['features']
+    
+    @property
+    def coordinates(self) -> np.ndarray:
+        return self.columns['coordinates']
+    
+    def position(self, site_id: str) -> Optional[int]:
+        return self._positions.get(site_id)
+    
+    def rows_for(self, site_ids: List[str]) -> np.ndarray:
+        """Rows of the given site ids, -1 for unknown sites"""
+        return np.array([self._positions.get(site_id, -1) for site_id in site_ids], dtype=np.intp)
+    
+    def state_code(self, state: str, create: bool = False) -> Optional[int]:
+        """Categorical code of a state name"""
+        code = self._state_codes.get(state)
+        if code is None and create:
+            code = len(self.state_categories)
+            self.state_categories.append(state)
+            self._state_codes[state] = code
+        return code
+    
+    @classmethod
+    def from_columns(cls, site_ids: List[str], state_categories: List[str],
+                     columns: Dict[str, Any]) -> 'SiteStore':
+        """Store over existing column arrays, e.g. memory-mapped from a shared snapshot"""
+        store = cls()
+        store.site_ids = list(site_ids)
+        store._positions = {site_id: row for row, site_id in enumerate(store.site_ids)}
+        store.state_categories = list(state_categories)
+        store._state_codes = {state: code for code, state in enumerate(store.state_categories)}
+        store.columns.update(columns)
+        return store
+    
+    def state_codes(self, states: List[str]) -> np.ndarray:
+        """Categorical codes for a sequence of state names, adding new categories"""
+        return np.array([self.state_code(state, create=True) for state in states], dtype=np.int32)
+    
+    def state(self, row: int) -> str:
+        return self.state_categories[self.columns['state_code'][row]]
+    
+    def columns_from_sites(self, sites: List[SiteData]) -> Dict[str, np.ndarray]:
+        """Convert SiteData records into column arrays"""
+        infrastructure_bits = {infra: 1 << i for i, infra in enumerate(INFRASTRUCTURE_TYPES)}
+        land_type_codes = {land_type: i for i, land_type in enumerate(LAND_TYPES)}
+        policy_zone_codes = {zone: i for i, zone in enumerate(POLICY_ZONES)}
+        
+        return {
+            'features': np.array(
+                [[getattr(site, column) for column in FEATURE_COLUMNS] for site in sites], dtype=np.float32
+            ).reshape(-1, len(FEATURE_COLUMNS)),
+            'coordinates': np.array([site.coordinates for site in sites], dtype=np.float64).reshape(-1, 2),
+            'state_code': self.state_codes([site.state for site in sites]),
+            'land_type_code': np.array([land_type_codes[site.land_type] for site in sites], dtype=np.uint8),
+            'policy_zone_code': np.array([policy_zone_codes[site.policy_zone] for site in sites], dtype=np.uint8),
+            'infrastructure_bits': np.array(
+                [sum(infrastructure_bits[infra] for infra in set(site.existing_infrastructure)) for site in sites],
+                dtype=np.uint8
+            ),
+            'suitability_score': np.array(
+                [np.nan if site.suitability_score is None else site.suitability_score for site in sites],
+                dtype=np.float32
+            ),
+            'name': np.array([site.name for site in sites], dtype=object),
+            'district': np.array([site.district for site in sites], dtype=object),
+            'policy_incentives': _object_column([tuple(site.policy_incentives) for site in sites]),
+            'estimated_roi': np.array([site.estimated_roi for site in sites], dtype=object),
+            'project_timeline': np.array([site.project_timeline for site in sites], dtype=object),
+            'annual_sunshine': np.array([site.annual_sunshine for site in sites], dtype=object),
+        }
+    
+    def upsert_columns(self, site_ids: List[str], columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """Insert or overwrite sites from column arrays; returns the rows written"""
+        # Duplicate ids within one batch: the last occurrence wins
+        site_ids, columns = dedupe_latest(site_ids, columns)
+        
+        # Packed columns are read-only; the first write turns them into private object arrays
+        for name, values in self.columns.items():
+            if isinstance(values, PackedColumn):
+                self.columns[name] = _object_column(values.tolist())
+        
+        rows = self.rows_for(site_ids)
+        existing = rows >= 0
+        if existing.any():
+            for name, values in columns.items():
+                self.columns[name][rows[existing]] = values[existing]
+        
+        if not existing.all():
+            new = ~existing
+            start = len(self.site_ids)
+            new_ids = [site_id for site_id, is_new in zip(site_ids, new) if is_new]
+            rows[new] = np.arange(start, start + len(new_ids))
+            for offset, site_id in enumerate(new_ids):
+                self._positions[site_id] = start + offset
+            self.site_ids.extend(new_ids)
+            for name, values in columns.items():
+                self.columns[name] = np.concatenate([self.columns[name], values[new]])
+        
+        return rows
+    
+    def upsert_sites(self, sites: List[SiteData]) -> np.ndarray:
+        """Insert or overwrite SiteData records; returns the rows written"""
+        return self.upsert_columns([site.id for site in sites], self.columns_from_sites(sites))
+    
+    def record(self, row: int) -> SiteData:
+        """Build the SiteData record for a row without re-running validation"""
+        columns = self.columns
+        features = columns['features'][row]
+        bits = int(columns['infrastructure_bits'][row])
+        score = columns['suitability_score'][row]
+        
+        return SiteData.model_construct(
+            id=self.site_ids[row],
+            name=columns['name'][row],
+            coordinates=columns['coordinates'][row].tolist(),
+            state=self.state(row),
+            district=columns['district'][row],
+            **{column: _compact_float(features[i]) for i, column in enumerate(FEATURE_COLUMNS)},
+            land_type=LAND_TYPES[columns['land_type_code'][row]],
+            policy_zone=POLICY_ZONES[columns['policy_zone_code'][row]],
+            existing_infrastructure=[infra for i, infra in enumerate(INFRASTRUCTURE_TYPES) if bits & (1 << i)],
+            policy_incentives=list(columns['policy_incentives'][row]),
+            estimated_roi=columns['estimated_roi'][row],
+            project_timeline=columns['project_timeline'][row],
+            suitability_score=None if np.isnan(score) else _compact_float(score),
+            annual_sunshine=columns['annual_sunshine'][row]
+        )
+    
+    def records(self, rows: Optional[np.ndarray] = None) -> List[SiteData]:
+        """SiteData records for the given rows (all rows by default)"""
+        if rows is None:
+            rows = range(len(self))
+        return [self.record(int(row)) for row in rows]
+    
+    def nbytes(self) -> int:
+        """Approximate memory held by the numeric columns"""
+        return sum(values.nbytes for values in self.columns.values() if values.dtype != object)
@@ -0,0 +1,148 @@
+import logging
+import math
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+class GeoGridIndex:
+    """Grid-hash spatial index over [lat, lon] points supporting incremental inserts"""
+    
+    def __init__(self, cell_size_deg: float = 0.5):
+        self.cell_size_deg = cell_size_deg
+        self._lats = np.empty(0)
+        self._lons = np.empty(0)
+        self._cells: Dict[Tuple[int, int], np.ndarray] = {}
+        self._item_cells: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._item_cells)
+    
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self.cell_size_deg)), int(math.floor(lon / self.cell_size_deg)))
+    
+    def build(self, coordinates: np.ndarray):
+        """Index an (n, 2) array of [lat, lon]; item ids are the row numbers"""
+        coordinates = np.asarray(coordinates, dtype=float).reshape(-1, 2)
+        lats = coordinates[:, 0].copy()
+        lons = coordinates[:, 1].copy()
+        cell_lat = np.floor(lats / self.cell_size_deg).astype(np.int64)
+        cell_lon = np.floor(lons / self.cell_size_deg).astype(np.int64)
+        
+        # Group rows by cell with one sort instead of a per-point Python loop
+        order = np.lexsort((cell_lon, cell_lat))
+        boundaries = np.flatnonzero(
+            (np.diff(cell_lat[order]) != 0) | (np.diff(cell_lon[order]) != 0)
+        ) + 1
+        cells = {}
+        for group in np.split(order, boundaries):
+            if len(group):
+                cells[(int(cell_lat[group[0]]), int(cell_lon[group[0]]))] = group
+        
+        with self._lock:
+            self._lats, self._lons = lats, lons
+            self._cells = cells
+            self._item_cells = {
+                int(item): cell for cell, group in cells.items() for item in group
+            }
+        logger.info(f"Spatial index built: {len(lats)} points in {len(cells)} cells")
+    
+    def insert(self, item: int, lat: float, lon: float):
+        """Add a point, or move it if the item is already indexed"""
+        cell = self._cell(lat, lon)
+        with self._lock:
+            if item >= len(self._lats):
+                # Grow the coordinate arrays geometrically to keep inserts amortized O(1)
+                capacity = max(item + 1, 2 * len(self._lats), 16)
+                self._lats = np.resize(self._lats, capacity)
+                self._lons = np.resize(self._lons, capacity)
+            
+            old_cell = self._item_cells.get(item)
+            if old_cell is not None:
+                remaining = self._cells[old_cell][self._cells[old_cell] != item]
+                if len(remaining):
+                    self._cells[old_cell] = remaining
+                else:
+                    del self._cells[old_cell]
+            
+            self._lats[item] = lat
+            self._lons[item] = lon
+            self._cells[cell] = np.append(self._cells.get(cell, np.empty(0, dtype=np.intp)), item)
+            self._item_cells[item] = cell
+    
+    def _candidates(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """Items in every cell overlapping the bounding box"""
+        lat_lo, lon_lo = self._cell(min_lat, min_lon)
+        lat_hi, lon_hi = self._cell(max_lat, max_lon)
+        groups = []
+        if (lat_hi - lat_lo + 1) * (lon_hi - lon_lo + 1) > len(self._cells):
+            # Very large boxes: scan occupied cells instead of every cell in the range
+            for (cell_lat, cell_lon), group in self._cells.items():
+                if lat_lo <= cell_lat <= lat_hi and lon_lo <= cell_lon <= lon_hi:
+                    groups.append(group)
+        else:
+            for cell_lat in range(lat_lo, lat_hi + 1):
+                for cell_lon in range(lon_lo, lon_hi + 1):
+                    group = self._cells.get((cell_lat, cell_lon))
+                    if group is not None:
+                        groups.append(group)
+        return np.concatenate(groups) if groups else np.empty(0, dtype=np.intp)
+    
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> np.ndarray:
+        """Items inside the bounding box (e.g. a map viewport)"""
+        with self._lock:
+            items = self._candidates(min_lat, min_lon, max_lat, max_lon)
+            lats, lons = self._lats[items], self._lons[items]
+        inside = (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+        return items[inside]
+    
+    def radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Items within radius_km of a point and their distances, nearest first"""
+        lat_span = radius_km / KM_PER_DEGREE_LAT
+        min_lat, max_lat = max(lat - lat_span, -90.0), min(lat + lat_span, 90.0)
+        widest_cos = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+        if widest_cos <= 1e-9 or radius_km / (KM_PER_DEGREE_LAT * widest_cos) >= 180:
+            min_lon, max_lon = -180.0, 180.0
+        else:
+            lon_span = radius_km / (KM_PER_DEGREE_LAT * widest_cos)
+            min_lon, max_lon = lon - lon_span, lon + lon_span
+        
+        with self._lock:
+            if min_lon < -180 or max_lon > 180:
+                # Wrap across the antimeridian by searching the whole longitude range
+                min_lon, max_lon = -180.0, 180.0
+            items = self._candidates(min_lat, min_lon, max_lat, max_lon)
+            lats, lons = self._lats[items], self._lons[items]
+        
+        distances = haversine_km(lat, lon, lats, lons)
+        inside = distances <= radius_km
+        items, distances = items[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return items[order], distances[order]
+    
+    def nearest(self, lat: float, lon: float, k: int, initial_radius_km: float = 50.0) -> Tuple[np.ndarray, np.ndarray]:
+        """The k items closest to a point and their distances, nearest first"""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        
+        # Every point within the radius is returned, so once k are found they are the k nearest
+        radius_km = initial_radius_km
+        while True:
+            items, distances = self.radius(lat, lon, radius_km)
+            if len(items) >= k or radius_km >= math.pi * EARTH_RADIUS_KM:
+                return items[:k], distances[:k]
+            radius_km *= 2
@@ -0,0 +1,263 @@
+import json
+import logging
+import math
+import os
+import struct
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models.data_models import CriteriaWeights, SiteData
+from models.suitability_model import HydrogenSuitabilityModel
+from services.map_tiles import MAX_MERCATOR_LAT
+
+logger = logging.getLogger(__name__)
+
+RASTER_FORMAT_VERSION = 1
+
+# Lat/lon extent of India with a small margin
+INDIA_BOUNDS = (6.0, 68.0, 37.5, 97.5)
+
+# Component layers are in [0, 1] and quantized to uint8
+COMPONENT_SCALE = 1 / 255
+
+# Legend classes from the frontend HeatmapLegend: (lower bound, RGB)
+SCORE_COLORS = [
+    (90, (0x2c, 0x97, 0x4b)),
+    (70, (0x91, 0xcf, 0x60)),
+    (40, (0xff, 0x99, 0x33)),
+    (0, (0x1f, 0x4e, 0x79)),
+]
+
+FeatureSource = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+class NearestSiteFeatureSource:
+    """Interpolates site features onto grid cells by inverse-distance weighting of the nearest sites"""
+    
+    def __init__(self, features: np.ndarray, coordinates: np.ndarray, k: int = 4, max_distance_km: float = 100.0):
+        from sklearn.neighbors import BallTree
+        
+        self.features = np.asarray(features, dtype=float)
+        self.k = min(k, len(self.features))
+        self.max_distance_rad = max_distance_km / 6371.0088
+        self.tree = BallTree(np.radians(np.asarray(coordinates, dtype=float)), metric='haversine')
+    
+    def __call__(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        distances, neighbours = self.tree.query(np.radians(np.column_stack([lats, lons])), k=self.k)
+        weights = 1.0 / np.maximum(distances, 1e-9)
+        weights[distances > self.max_distance_rad] = 0.0
+        totals = weights.sum(axis=1, keepdims=True)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.einsum('nk,nkf->nf', weights, self.features[neighbours]) / totals
+        # Cells with no site within range have no data
+        values[totals[:, 0] == 0] = np.nan
+        return values
+
+def build_suitability_raster(model: HydrogenSuitabilityModel, feature_source: FeatureSource, out_dir: str,
+                             bounds: Tuple[float, float, float, float] = INDIA_BOUNDS,
+                             resolution_deg: float = 0.05, chunk_cells: int = 262144) -> Dict[str, Any]:
+    """Score a regular lat/lon grid in chunks and store weight-independent layers as memory-mappable arrays"""
+    min_lat, min_lon, max_lat, max_lon = bounds
+    height = int(math.ceil((max_lat - min_lat) / resolution_deg))
+    width = int(math.ceil((max_lon - min_lon) / resolution_deg))
+    os.makedirs(out_dir, exist_ok=True)
+    
+    components_path = os.path.join(out_dir, 'components.npy')
+    base_path = os.path.join(out_dir, 'base_score.npy')
+    components = np.lib.format.open_memmap(components_path + '.tmp', mode='w+', dtype=np.uint8, shape=(height, width, 6))
+    base_scores = np.lib.format.open_memmap(base_path + '.tmp', mode='w+', dtype=np.float16, shape=(height, width))
+    
+    # Chunk by whole rows so each write is a contiguous slice
+    chunk_rows = max(1, chunk_cells // width)
+    col_lons = min_lon + (np.arange(width) + 0.5) * resolution_deg
+    for row_start in range(0, height, chunk_rows):
+        row_end = min(row_start + chunk_rows, height)
+        row_lats = min_lat + (np.arange(row_start, row_end) + 0.5) * resolution_deg
+        lats = np.repeat(row_lats, width)
+        lons = np.tile(col_lons, row_end - row_start)
+        
+        features = feature_source(lats, lons)
+        valid = ~np.isnan(features).any(axis=1)
+        chunk_components = np.zeros((len(lats), 6))
+        chunk_base = np.full(len(lats), np.nan)
+        if valid.any():
+            chunk_components[valid] = model.component_scores(features[valid])
+            predicted = model.predict_base_scores(features[valid])
+            if predicted is None:
+                raise ValueError("Model not loaded; cannot build suitability raster")
+            chunk_base[valid] = predicted
+        
+        components[row_start:row_end] = np.rint(
+            np.clip(chunk_components, 0, 1) / COMPONENT_SCALE
+        ).astype(np.uint8).reshape(row_end - row_start, width, 6)
+        base_scores[row_start:row_end] = chunk_base.reshape(row_end - row_start, width)
+        logger.info(f"Scored raster rows {row_start}-{row_end} of {height}")
+    
+    components.flush()
+    base_scores.flush()
+    del components, base_scores
+    
+    manifest = {
+        'format_version': RASTER_FORMAT_VERSION,
+        'model_version': model.model_version,
+        'bounds': [min_lat, min_lon, max_lat, max_lon],
+        'resolution_deg': resolution_deg,
+        'shape': [height, width],
+        'component_layers': ['solar', 'wind', 'water', 'industry_proximity', 'grid_proximity', 'land_availability'],
+        'component_scale': COMPONENT_SCALE,
+        'nodata': 'NaN in base_score'
+    }
+    os.replace(components_path + '.tmp', components_path)
+    os.replace(base_path + '.tmp', base_path)
+    # The manifest is written last so readers never open a half-built raster
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    
+    logger.info(f"Suitability raster {height}x{width} written to {out_dir}")
+    return manifest
+
+def _encode_png(rgba: np.ndarray) -> bytes:
+    """Encode an (h, w, 4) uint8 array as a PNG"""
+    height, width, _ = rgba.shape
+    raw = b''.join(b'\x00' + rgba[row].tobytes() for row in range(height))
+    
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+    
+    return (
+        b'\x89PNG\r\n\x1a\n' +
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)) +
+        chunk(b'IDAT', zlib.compress(raw, 6)) +
+        chunk(b'IEND', b'')
+    )
+
+class SuitabilityRaster:
+    """Read-only view over a precomputed suitability raster"""
+    
+    def __init__(self, path: str, model: HydrogenSuitabilityModel):
+        with open(os.path.join(path, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('format_version') != RASTER_FORMAT_VERSION:
+            raise ValueError(f"Unsupported raster format at {path}")
+        
+        self.model = model
+        self.components = np.load(os.path.join(path, 'components.npy'), mmap_mode='r')
+        self.base_scores = np.load(os.path.join(path, 'base_score.npy'), mmap_mode='r')
+        self.min_lat, self.min_lon, self.max_lat, self.max_lon = self.manifest['bounds']
+        self.resolution_deg = self.manifest['resolution_deg']
+        self.height, self.width = self.manifest['shape']
+        
+        if self.manifest['model_version'] != model.model_version:
+            logger.warning(
+                f"Suitability raster was built with model {self.manifest['model_version']}, "
+                f"serving model is {model.model_version}"
+            )
+    
+    @staticmethod
+    def _check_weights(weights: CriteriaWeights):
+        # The raster has no demand layer: demand centres change at runtime, the raster is built offline
+        if weights.demand:
+            raise ValueError("The suitability raster does not support the demand criterion; set demand to 0")
+    
+    def _score_cells(self, rows: np.ndarray, cols: np.ndarray, weights: CriteriaWeights) -> np.ndarray:
+        """Re-weight stored layers for the given cells; NaN marks no data"""
+        components = self.components[rows, cols].astype(np.float32) * self.manifest['component_scale']
+        base_scores = self.base_scores[rows, cols].astype(np.float32)
+        return self.model.combine_scores(components.reshape(-1, 6), base_scores.reshape(-1), weights).reshape(rows.shape)
+    
+    def _cell_offset(self, value: float, origin: float) -> float:
+        # Rounded so grid-aligned bounds such as 70.2 do not snap outward on float error
+        return round((value - origin) / self.resolution_deg, 9)
+    
+    def window(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+               weights: CriteriaWeights, step: int = 1, max_cells: Optional[int] = None) -> Dict[str, Any]:
+        """Suitability values for the cells inside a bounding box, south row first.
+        
+        When the window would exceed max_cells at the requested step, the step is raised until it fits.
+        """
+        self._check_weights(weights)
+        row_lo = max(math.floor(self._cell_offset(min_lat, self.min_lat)), 0)
+        row_hi = min(math.ceil(self._cell_offset(max_lat, self.min_lat)), self.height)
+        col_lo = max(math.floor(self._cell_offset(min_lon, self.min_lon)), 0)
+        col_hi = min(math.ceil(self._cell_offset(max_lon, self.min_lon)), self.width)
+        if row_lo >= row_hi or col_lo >= col_hi:
+            return {'bounds': None, 'resolution_deg': self.resolution_deg * step, 'values': []}
+        
+        if max_cells is not None:
+            n_rows, n_cols = row_hi - row_lo, col_hi - col_lo
+            step = max(step, int(math.sqrt(n_rows * n_cols / max_cells)))
+            while math.ceil(n_rows / step) * math.ceil(n_cols / step) > max_cells:
+                step += 1
+        
+        rows, cols = np.meshgrid(
+            np.arange(row_lo, row_hi, step), np.arange(col_lo, col_hi, step), indexing='ij'
+        )
+        scores = np.round(self._score_cells(rows, cols, weights), 2)
+        return {
+            'bounds': [
+                round(self.min_lat + row_lo * self.resolution_deg, 9),
+                round(self.min_lon + col_lo * self.resolution_deg, 9),
+                round(self.min_lat + row_hi * self.resolution_deg, 9),
+                round(self.min_lon + col_hi * self.resolution_deg, 9)
+            ],
+            'resolution_deg': self.resolution_deg * step,
+            # One bulk conversion to Python floats, with no-data cells as None
+            'values': np.where(np.isnan(scores), None, scores.astype(object)).tolist()
+        }
+    
+    def render_tile(self, z: int, x: int, y: int, weights: CriteriaWeights, size: int = 256) -> bytes:
+        """Render XYZ tile z/x/y as a PNG coloured by the legend classes"""
+        self._check_weights(weights)
+        n = 2 ** z
+        pixel = (np.arange(size) + 0.5) / size
+        lons = (x + pixel) / n * 360.0 - 180.0
+        lats = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * (y + pixel) / n))))
+        lats = np.clip(lats, -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+        
+        rows = np.floor((lats - self.min_lat) / self.resolution_deg).astype(np.int64)
+        cols = np.floor((lons - self.min_lon) / self.resolution_deg).astype(np.int64)
+        rows, cols = np.meshgrid(rows, cols, indexing='ij')
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        
+        rgba = np.zeros((size, size, 4), dtype=np.uint8)
+        if inside.any():
+            scores = np.full((size, size), np.nan, dtype=np.float32)
+            scores[inside] = self._score_cells(rows[inside], cols[inside], weights)
+            painted = np.zeros((size, size), dtype=bool)
+            for lower, color in SCORE_COLORS:
+                mask = ~painted & (scores >= lower)
+                rgba[mask] = (*color, 180)
+                painted |= mask
+        return _encode_png(rgba)
+
+def main():
+    import argparse
+    
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Precompute the national suitability raster")
+    parser.add_argument("--sites", required=True, help="JSON file with a list of SiteData records")
+    parser.add_argument("--out", default="data/suitability_raster")
+    parser.add_argument("--model-path", default="models/hydrogen_suitability_model.pkl")
+    parser.add_argument("--resolution-deg", type=float, default=0.05)
+    parser.add_argument("--max-distance-km", type=float, default=100.0)
+    args = parser.parse_args()
+    
+    model = HydrogenSuitabilityModel(model_path=args.model_path)
+    if not model.load_model(train_if_missing=False):
+        raise SystemExit(f"No model artifact at {args.model_path}")
+    
+    with open(args.sites) as f:
+        sites: List[SiteData] = [SiteData(**record) for record in json.load(f)]
+    source = NearestSiteFeatureSource(
+        model.extract_features_batch(sites),
+        np.array([site.coordinates for site in sites], dtype=float),
+        max_distance_km=args.max_distance_km
+    )
+    build_suitability_raster(model, source, args.out, resolution_deg=args.resolution_deg)
+
+if __name__ == "__main__":
+    main()
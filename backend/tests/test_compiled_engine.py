@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from models.suitability_model import CompiledTreeEnsemble, HydrogenSuitabilityModel
+
+
+@pytest.fixture(scope="module")
+def trained_model(tmp_path_factory):
+    model_path = tmp_path_factory.mktemp("models") / "model.pkl"
+    model = HydrogenSuitabilityModel(model_path=str(model_path), use_compiled_engine=True)
+    model._train_model(cv_folds=1)
+    return model
+
+
+def _sklearn_predict(model: HydrogenSuitabilityModel, X: np.ndarray) -> np.ndarray:
+    X_selected = model.scaler.transform(X)
+    if model.feature_selector:
+        X_selected = model.feature_selector.transform(X_selected)
+    return model.model.predict(X_selected)
+
+
+def test_engine_is_compiled(trained_model):
+    engine = trained_model.compiled_engine
+    assert isinstance(engine, CompiledTreeEnsemble)
+    assert engine.n_trees == trained_model.model.n_estimators_
+
+
+def test_batch_matches_sklearn_pipeline(trained_model):
+    X, _ = trained_model._prepare_training_data()
+    expected = _sklearn_predict(trained_model, X)
+    np.testing.assert_allclose(trained_model.compiled_engine.predict(X), expected, rtol=0, atol=1e-9)
+
+
+def test_single_rows_match_sklearn_pipeline(trained_model):
+    X, _ = trained_model._prepare_training_data(n_samples=50, seed=7)
+    expected = _sklearn_predict(trained_model, X)
+    for row, score in zip(X, expected):
+        result = trained_model.compiled_engine.predict(row)
+        assert result.shape == (1,)
+        assert result[0] == pytest.approx(score, rel=0, abs=1e-9)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_site_store import synthetic_sites
+from models.suitability_model import HydrogenSuitabilityModel
+from services.site_scores import SiteScoreTable
+from services.site_statistics import SiteStatistics
+
+
+@pytest.fixture()
+def table(tmp_path):
+    model = HydrogenSuitabilityModel(model_path=str(tmp_path / "model.pkl"))
+    model._train_model(cv_folds=1)
+    table = SiteScoreTable(model)
+    table.load(synthetic_sites(500))
+    return table
+
+
+def test_fresh_load_is_consistent(table):
+    statistics = SiteStatistics(table)
+    assert statistics.statistics().total_sites == 500
+    assert statistics.check_consistency() == []
+
+
+def test_reload_resets_aggregates(table):
+    statistics = SiteStatistics(table)
+    table.load(synthetic_sites(120, seed=3))
+    assert statistics.statistics().total_sites == 120
+    assert statistics.check_consistency() == []
+
+
+def test_running_aggregates_match_recompute(table):
+    statistics = SiteStatistics(table)
+    rng = np.random.default_rng(0)
+    
+    # Random upserts: refreshed existing sites mixed with new ones
+    for step in range(5):
+        updates = synthetic_sites(50, seed=100 + step)
+        ids = [f"site-{i}" for i in rng.choice(700, size=len(updates), replace=False)]
+        table.upsert_sites([site.model_copy(update={'id': site_id}) for site, site_id in zip(updates, ids)])
+        assert statistics.check_consistency() == []
+    
+    # Move sites into another existing state and into a state the table has not seen
+    moved = [site.model_copy(update={'id': f"site-{i}", 'state': 'Gujarat'}) for i, site in enumerate(synthetic_sites(20, seed=7))]
+    table.upsert_sites(moved)
+    table.upsert_sites([moved[0].model_copy(update={'state': 'Odisha'})])
+    assert statistics.check_consistency() == []
+    
+    # Retrain so every base score changes, then rescore the whole table
+    model = table.model
+    model._train_model(*model._prepare_training_data(seed=7), cv_folds=1)
+    table.refresh_base_scores()
+    assert statistics.check_consistency() == []
+    
+    full = statistics.recompute()
+    assert statistics.statistics().total_sites == full.total_sites == len(table)
+    assert statistics.statistics().average_score == pytest.approx(full.average_score)
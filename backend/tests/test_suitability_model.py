@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_site_store import synthetic_sites
+from models.data_models import CriteriaWeights
+from models.suitability_model import COMPILED_ENGINE_MAX_ROWS, HydrogenSuitabilityModel
+
+WEIGHTS = [
+    CriteriaWeights(),
+    CriteriaWeights(solar=10, wind=40, water=5, industry_proximity=25, grid_proximity=15, land_availability=5),
+]
+
+
+def _trained_model(path, use_compiled_engine: bool) -> HydrogenSuitabilityModel:
+    model = HydrogenSuitabilityModel(model_path=str(path), use_compiled_engine=use_compiled_engine)
+    model._train_model(cv_folds=1)
+    return model
+
+
+@pytest.fixture(scope="module")
+def sklearn_model(tmp_path_factory):
+    return _trained_model(tmp_path_factory.mktemp("models") / "model.pkl", use_compiled_engine=False)
+
+
+@pytest.fixture(scope="module")
+def compiled_model(tmp_path_factory):
+    return _trained_model(tmp_path_factory.mktemp("models") / "model.pkl", use_compiled_engine=True)
+
+
+def _assert_batch_matches_single(model: HydrogenSuitabilityModel, n_sites: int):
+    sites = synthetic_sites(n_sites, seed=11)
+    for weights in WEIGHTS:
+        expected = np.array([model.predict_suitability(site, weights) for site in sites])
+        np.testing.assert_allclose(model.predict_suitability_batch(sites, weights), expected, rtol=0, atol=1e-9)
+
+
+def test_batch_matches_single_sklearn(sklearn_model):
+    assert sklearn_model.compiled_engine is None
+    _assert_batch_matches_single(sklearn_model, 200)
+
+
+def test_batch_matches_single_compiled(compiled_model):
+    assert compiled_model.compiled_engine is not None
+    _assert_batch_matches_single(compiled_model, COMPILED_ENGINE_MAX_ROWS)
+
+
+def test_large_batch_matches_single_compiled(compiled_model):
+    # Past COMPILED_ENGINE_MAX_ROWS the batch runs on sklearn while single sites stay on the compiled engine
+    _assert_batch_matches_single(compiled_model, COMPILED_ENGINE_MAX_ROWS + 100)
+
+
+def test_batch_matches_single_fallback(tmp_path):
+    model = HydrogenSuitabilityModel(model_path=str(tmp_path / "missing.pkl"))
+    assert model.model is None
+    _assert_batch_matches_single(model, 100)
+
+
+def test_empty_batch():
+    assert HydrogenSuitabilityModel(model_path="missing.pkl").predict_suitability_batch([], WEIGHTS[0]).shape == (0,)
@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+
+from models.data_models import CriteriaWeights
+from models.suitability_model import HydrogenSuitabilityModel
+from services.suitability_raster import COMPONENT_SCALE, RASTER_FORMAT_VERSION, SuitabilityRaster
+
+
+@pytest.fixture()
+def raster(tmp_path):
+    # 0.05 degree grid over lat 6-8, lon 68-71; the layers only need to be well-formed
+    height, width = 40, 60
+    rng = np.random.default_rng(0)
+    np.save(tmp_path / "components.npy", rng.integers(0, 256, (height, width, 6)).astype(np.uint8))
+    np.save(tmp_path / "base_score.npy", rng.uniform(0, 100, (height, width)).astype(np.float16))
+    with open(tmp_path / "manifest.json", "w") as f:
+        json.dump({
+            'format_version': RASTER_FORMAT_VERSION,
+            'model_version': None,
+            'bounds': [6.0, 68.0, 8.0, 71.0],
+            'resolution_deg': 0.05,
+            'shape': [height, width],
+            'component_scale': COMPONENT_SCALE
+        }, f)
+    return SuitabilityRaster(str(tmp_path), HydrogenSuitabilityModel(model_path=str(tmp_path / "model.pkl")))
+
+
+def test_grid_aligned_window_keeps_its_bounds(raster):
+    window = raster.window(7.0, 70.0, 7.2, 70.2, CriteriaWeights())
+    assert window['bounds'] == [7.0, 70.0, 7.2, 70.2]
+    assert len(window['values']) == 4
+    assert all(len(row) == 4 for row in window['values'])
+
+
+def test_unaligned_window_snaps_outward(raster):
+    window = raster.window(7.01, 70.01, 7.19, 70.21, CriteriaWeights())
+    assert window['bounds'] == [7.0, 70.0, 7.2, 70.25]
+
+
+def test_large_window_is_coarsened_to_max_cells(raster):
+    window = raster.window(6.0, 68.0, 8.0, 71.0, CriteriaWeights(), max_cells=600)
+    assert window['resolution_deg'] == pytest.approx(0.1)
+    assert len(window['values']) * len(window['values'][0]) <= 600
+
+
+def test_demand_is_rejected(raster):
+    with pytest.raises(ValueError):
+        raster.window(7.0, 70.0, 7.2, 70.2, CriteriaWeights(demand=10))